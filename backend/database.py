@@ -1,7 +1,14 @@
 # backend/database.py
 import os
+from dotenv import load_dotenv
+from sqlalchemy import inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlmodel import SQLModel, create_engine, Session
 
+# Every backend module imports this one first and the services read their
+# settings at import time, so .env has to be loaded here rather than in main
+load_dotenv()
+
 # Use SQLite for development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./jobhunter.db")
 
@@ -10,7 +17,35 @@ engine = create_engine(DATABASE_URL, echo=True)
 
 def create_db_and_tables():
     """Create all database tables"""
+    from backend.services.search import ensure_search_indexes
+
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+    ensure_search_indexes(engine)
+
+def add_missing_columns():
+    """create_all() never alters existing tables, so add new nullable columns and their indexes"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def dialect_insert(bind):
+    """The dialect's INSERT construct, which supports ON CONFLICT upserts"""
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise RuntimeError(f"Upserts need a sqlite or postgresql database, not {dialect}")
 
 def get_db():
     """Dependency for getting database session"""
@@ -0,0 +1,57 @@
+# backend/llm_mock.py
+"""
+Stand-in for an OpenAI-compatible chat completions API, for local runs and
+tests without network access or an API key:
+
+    uvicorn backend.llm_mock:app --port 8001
+    OPENAI_BASE_URL=http://localhost:8001/v1 OPENAI_API_KEY=mock uvicorn backend.main:app
+
+MOCK_LLM_DELAY is the pause before each streamed word (seconds), to exercise
+timeouts and streaming. A prompt containing MOCK_FAIL gets an HTTP 500.
+"""
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MOCK_LLM_DELAY = float(os.getenv("MOCK_LLM_DELAY", "0.02"))
+
+app = FastAPI(title="JobHunter LLM mock")
+
+
+def _reply(messages: list, max_tokens: int) -> list:
+    prompt = " ".join(message.get("content", "") for message in messages)
+    words = ["Dear", "Hiring", "Manager,", "this", "is", "a", "mock", "reply", "to:"] + prompt.split()[:60]
+    return [f"{word} " for word in words[:max_tokens]]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    if any("MOCK_FAIL" in message.get("content", "") for message in messages):
+        return JSONResponse({"error": {"message": "mock failure"}}, status_code=500)
+    words = _reply(messages, int(body.get("max_tokens") or 500))
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(MOCK_LLM_DELAY * len(words))
+        return {
+            "id": "mock", "object": "chat.completion", "created": created, "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(words), "total_tokens": len(words)},
+        }
+
+    async def chunks():
+        for word in words:
+            await asyncio.sleep(MOCK_LLM_DELAY)
+            chunk = {"id": "mock", "object": "chat.completion.chunk", "created": created,
+                     "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
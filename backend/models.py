@@ -1,3 +1,4 @@
+from sqlalchemy import BigInteger, Column, Index
 from sqlmodel import SQLModel, Field
 from typing import Optional, List
 from datetime import datetime
@@ -11,6 +12,7 @@ class ApplicationStatus(str, Enum):
     REJECTED = "rejected"
 
 class Application(SQLModel, table=True):
+    __table_args__ = (Index("ix_application_created_at_id", "created_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     company: str
@@ -21,13 +23,52 @@ class Application(SQLModel, table=True):
     applied_date: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class CoverLetterDraft(SQLModel, table=True):
+    """Cover letter kept for an application: written ahead of time (services/drafts.py) or the last one requested"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    application_id: int = Field(foreign_key="application.id", index=True, unique=True)
+    resume_id: Optional[int] = None  # resume whose skills the letter uses
+    content: Optional[str] = None  # None while the draft task is pending
+    task_id: Optional[int] = None  # pending speculative task, cancelled if the letter is requested first
+    inputs_hash: Optional[str] = None  # posting and resume the letter was written from (drafts.inputs_hash)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ApplicationStat(SQLModel, table=True):
+    """Incrementally maintained application counts per status, company and ISO week"""
+    dimension: str = Field(primary_key=True)  # "status", "company" or "week"
+    key: str = Field(primary_key=True)
+    count: int = 0
+
 class Resume(SQLModel, table=True):
+    __table_args__ = (Index("ix_resume_created_at_id", "created_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     file_path: str
-    content: str
+    file_name: Optional[str] = None  # name of the uploaded file, the blob itself is stored by hash
+    content: str  # normalized text extracted from the file
+    content_hash: Optional[str] = Field(default=None, index=True)  # SHA-256 of the uploaded file (Blob key)
+    token_count: Optional[int] = None
+    keyword_counts: Optional[str] = None  # JSON {canonical skill: occurrences}
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class Blob(SQLModel, table=True):
+    """Content-addressed uploaded file, shared by every row that references the same bytes"""
+    sha256: str = Field(primary_key=True)
+    size: int
+    refcount: int = 0
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class CacheEntry(SQLModel, table=True):
+    """Memoized result (services/memo.py); `key` starts with the namespace"""
+    __table_args__ = (Index("ix_cacheentry_namespace_last_used_at", "namespace", "last_used_at"),)
+    key: str = Field(primary_key=True)
+    namespace: str
+    value: str  # JSON
+    size: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow)
+
 class Contact(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
@@ -38,6 +79,7 @@ class Contact(SQLModel, table=True):
     notes: str
 
 class JobPosting(SQLModel, table=True):
+    __table_args__ = (Index("ix_jobposting_created_at_id", "created_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     company: str
@@ -46,4 +88,64 @@ class JobPosting(SQLModel, table=True):
     url: str
     source: str
     published_at: datetime
+    dedup_key: Optional[str] = Field(default=None, index=True, unique=True)  # hash of normalized GUID/URL
+    duplicate_of: Optional[int] = Field(default=None, foreign_key="jobposting.id", index=True)  # canonical posting
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.utcnow)
+
+class JobFingerprint(SQLModel, table=True):
+    """MinHash signature of a posting's title, company and description"""
+    posting_id: int = Field(foreign_key="jobposting.id", primary_key=True)
+    signature: str  # comma-separated hex MinHash values
+
+class JobFingerprintBand(SQLModel, table=True):
+    """LSH band buckets of a JobFingerprint, looked up to find near-duplicate candidates"""
+    __table_args__ = (Index("ix_jobfingerprintband_band_bucket", "band", "bucket"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    posting_id: int = Field(foreign_key="jobposting.id", index=True)
+    band: int
+    bucket: int = Field(sa_column=Column(BigInteger, nullable=False))
+
+class FeedState(SQLModel, table=True):
+    """Per-feed conditional GET bookkeeping, so unchanged feeds are not re-parsed"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    feed_url: str = Field(index=True, unique=True)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    last_entry_ids: str = "[]"  # JSON list of entry GUIDs from the last parse
+    last_status: Optional[int] = None
+    last_fetched_at: Optional[datetime] = None
+    # Adaptive polling schedule (see backend/services/scheduler.py)
+    scheduled: Optional[bool] = Field(default=False, index=True)
+    poll_interval: Optional[int] = None  # seconds
+    next_run_at: Optional[datetime] = Field(default=None, index=True)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class TaskStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Task(SQLModel, table=True):
+    """Durable background job, claimed by workers with a visibility timeout"""
+    __table_args__ = (Index("ix_task_status_run_after", "status", "run_after"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(index=True)
+    payload: str = "{}"  # JSON arguments for the handler
+    status: TaskStatus = TaskStatus.QUEUED
+    priority: int = 0  # higher runs first
+    attempts: int = 0
+    max_attempts: int = 3
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    locked_by: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    progress: float = 0.0
+    progress_message: Optional[str] = None
+    result: Optional[str] = None  # JSON
+    error: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,155 @@
+# backend/services/blob_store.py
+"""
+Content-addressed file storage.
+
+Uploads are streamed to a temporary file in chunks while their SHA-256 is
+computed, then moved to blobs/<first two hex digits>/<sha256>. Identical
+uploads share one file: the Blob row counts references and the file is removed
+when the last one is released. Files are immutable, so the hash doubles as a
+strong ETag.
+
+The file is moved into place or unlinked inside the transaction that changes
+its row, after the row's write lock is taken. A put() and a release() of the
+same bytes therefore take turns, and a committed row always has its file.
+"""
+import hashlib
+import logging
+import os
+import re
+import uuid
+from typing import BinaryIO, Optional, Tuple
+
+from sqlalchemy import delete, update
+from sqlmodel import Session
+
+from backend.database import dialect_insert
+from backend.models import Blob
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = os.getenv("BLOB_DIR", "data/blobs")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class BlobTooLarge(Exception):
+    """The upload is larger than the configured size cap"""
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range lies outside the blob"""
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def write_temp(source: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, str, int]:
+    """
+    Copy a stream to a temporary file in CHUNK_SIZE pieces, hashing on the way.
+    Returns (temp path, sha256, size); raises BlobTooLarge past `max_bytes`.
+    """
+    os.makedirs(os.path.join(BLOB_DIR, "tmp"), exist_ok=True)
+    temp = os.path.join(BLOB_DIR, "tmp", uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp, "wb") as f:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BlobTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(temp)
+        raise
+    return temp, digest.hexdigest(), size
+
+
+def put(db: Session, source: BinaryIO, max_bytes: int = MAX_UPLOAD_BYTES) -> Blob:
+    """Store a stream (or add a reference to an identical stored one) and return its Blob"""
+    temp, sha256, size = write_temp(source, max_bytes)
+    try:
+        insert = dialect_insert(db.get_bind())
+        stmt = insert(Blob.__table__).values(sha256=sha256, size=size, refcount=1)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["sha256"], set_={"refcount": Blob.__table__.c.refcount + 1},
+        ))
+        # The upsert holds the row's lock: no release() can unlink the file until the commit
+        path = blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(temp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp, path)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    return db.get(Blob, sha256, populate_existing=True)
+
+
+def release(db: Session, sha256: str):
+    """Drop one reference; the file goes with the last one"""
+    table = Blob.__table__
+    try:
+        db.execute(update(table).where(table.c.sha256 == sha256).values(refcount=table.c.refcount - 1))
+        removed = db.execute(delete(table).where(table.c.sha256 == sha256, table.c.refcount <= 0)).rowcount
+        if removed:
+            # Still holding the row's lock, so a concurrent put() of the same bytes waits for the
+            # commit and then writes the file again
+            try:
+                os.remove(blob_path(sha256))
+            except FileNotFoundError:
+                pass
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    if removed:
+        logger.info(f"Removed blob {sha256}")
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into inclusive (start, end). Returns None
+    when the whole file should be sent (no header, or a form we don't serve such
+    as multiple ranges); raises RangeNotSatisfiable for ranges past the end.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # invalid, so ignored
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def iter_file(path: str, start: int = 0, end: Optional[int] = None):
+    """Yield the bytes start..end (inclusive) of a file in CHUNK_SIZE pieces"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (end - start + 1) if end is not None else None
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                return
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
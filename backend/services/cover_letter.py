@@ -1,74 +1,128 @@
-import os
-from typing import Optional
+import logging
+from typing import AsyncIterator, List, Optional, Tuple
+from backend.models import Application, Resume
+from backend.services.drafts import delete_draft, drop_draft_task, save_draft, stored_draft
+from backend.services.keywords import skill_matcher
+from backend.services.llm import LLMError, Messages, llm
+from backend.services.prompt_builder import PromptPart, build_prompt
+from backend.services.resume_text import resume_keywords
 
-def generate_cover_letter(application_id: str, db) -> str:
+logger = logging.getLogger(__name__)
+
+async def generate_cover_letter(application_id: str, db, resume_id: Optional[int] = None,
+                                user: str = "anonymous", fallback: bool = True, regenerate: bool = False) -> str:
     """
-    Generate cover letter using OpenAI GPT or fallback template
+    Generate cover letter using the LLM gateway, or the template when it is
+    not configured, fails or times out. With fallback=False the LLMError is
+    raised instead. A letter kept for the application is returned as is,
+    unless regenerate=True discards it first.
     """
-    openai_key = os.getenv("OPENAI_API_KEY")
-    
-    if openai_key:
-        return _generate_with_gpt(application_id, db, openai_key)
+    application = db.get(Application, int(application_id))
+    if not application:
+        return "Application not found"
+    if regenerate:
+        delete_draft(db, application.id)
     else:
-        return _generate_with_template(application_id, db)
+        draft = stored_draft(db, application.id, resume_id)
+        if draft is not None:
+            return draft
+        drop_draft_task(db, application.id)
+    skills = matching_skills(application, db, resume_id)
 
-def _generate_with_gpt(application_id: str, db, api_key: str) -> str:
-    """Generate cover letter using OpenAI GPT"""
-    try:
-        import openai
-        openai.api_key = api_key
-        
-        # Get application details from database
-        application = db.exec(
-            "SELECT * FROM application WHERE id = ?", 
-            (application_id,)
-        ).first()
-        
-        if not application:
-            return "Application not found"
-        
-        prompt = f"""
-        Write a professional cover letter for this job application:
-        
-        Position: {application.title}
-        Company: {application.company}
-        Job Description: {application.description[:1000]}
-        
-        Write a compelling cover letter that highlights relevant experience
-        and shows enthusiasm for the role. Keep it professional and concise.
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500
-        )
-        
-        return response.choices[0].message.content
-    except Exception as e:
-        return _generate_with_template(application_id, db)
+    if llm.enabled or not fallback:
+        try:
+            # A regenerated letter must not come back from the response cache
+            letter = await llm.complete(_cover_letter_messages(application, skills), user=user, cache=not regenerate)
+            save_draft(db, application.id, resume_id, letter)
+            return letter
+        except LLMError as e:
+            if not fallback:
+                raise
+            logger.warning(f"Cover letter generation fell back to the template: {e}")
+    return _template(application, skills)
 
-def _generate_with_template(application_id: str, db) -> str:
-    """Generate cover letter using basic template"""
-    application = db.exec(
-        "SELECT * FROM application WHERE id = ?", 
-        (application_id,)
-    ).first()
-    
+async def stream_cover_letter(application_id: str, db, resume_id: Optional[int] = None,
+                              user: str = "anonymous", regenerate: bool = False) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Yield ("token", text) pieces as the LLM writes them. When the LLM is not
+    available or fails midway, yield ("fallback", template letter) once; the
+    client replaces what it has shown so far. A letter kept for the
+    application comes back at once as ("draft", letter), unless
+    regenerate=True discards it first.
+    """
+    application = db.get(Application, int(application_id))
     if not application:
-        return "Application not found"
-    
+        return
+    if regenerate:
+        delete_draft(db, application.id)
+    else:
+        draft = stored_draft(db, application.id, resume_id)
+        if draft is not None:
+            yield "draft", draft
+            return
+        drop_draft_task(db, application.id)
+    skills = matching_skills(application, db, resume_id)
+
+    if llm.enabled:
+        try:
+            pieces = []
+            async for text in llm.stream(_cover_letter_messages(application, skills), user=user,
+                                         cache=not regenerate):
+                pieces.append(text)
+                yield "token", text
+            save_draft(db, application.id, resume_id, "".join(pieces))
+            return
+        except LLMError as e:
+            logger.warning(f"Cover letter stream fell back to the template: {e}")
+    yield "fallback", _template(application, skills)
+
+def matching_skills(application: Application, db, resume_id: Optional[int]) -> List[str]:
+    """Skills the job asks for that the resume has, from the counts stored at upload"""
+    resume = db.get(Resume, int(resume_id)) if resume_id is not None else None
+    skills = resume_keywords(resume) if resume else None
+    if not skills:
+        return []
+    wanted = skill_matcher().counts(f"{application.title} {application.description}")
+    return sorted((skill for skill in wanted if skill in skills), key=lambda skill: -skills[skill])
+
+_COVER_LETTER_PROMPT = """
+    Write a professional cover letter for this job application:
+
+    Position: {title}
+    Company: {company}
+    Job Description: {description}
+    Candidate's Relevant Skills: {skills}
+
+    Write a compelling cover letter that highlights relevant experience
+    and shows enthusiasm for the role. Keep it professional and concise.
+    """
+
+def _cover_letter_messages(application: Application, skills: List[str]) -> Messages:
+    # The parts of the posting closest to the title and the candidate's skills, within the token budget
+    description = PromptPart(application.description, query=f"{application.title} {' '.join(skills)}")
+    prompt = build_prompt(
+        _COVER_LETTER_PROMPT, {"description": description},
+        title=application.title, company=application.company, skills=', '.join(skills) or 'not provided',
+    )
+    return [{"role": "user", "content": prompt}]
+
+def _template(application: Application, skills: List[str]) -> str:
+    """Generate cover letter using basic template"""
+    qualifications = (
+        f"My experience with {', '.join(skills[:5])} matches what you are looking for in this role."
+        if skills else "[Your specific qualifications and enthusiasm for the role]"
+    )
     return f"""
     Dear Hiring Manager,
-    
-    I am writing to express my interest in the {application.title} position at {application.company}. 
+
+    I am writing to express my interest in the {application.title} position at {application.company}.
     With my background and experience, I believe I would be a valuable asset to your team.
-    
-    [Your specific qualifications and enthusiasm for the role]
-    
-    Thank you for considering my application. I look forward to the opportunity to discuss 
+
+    {qualifications}
+
+    Thank you for considering my application. I look forward to the opportunity to discuss
     how I can contribute to {application.company}'s success.
-    
+
     Sincerely,
     [Your Name]
     """
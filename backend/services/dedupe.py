@@ -0,0 +1,182 @@
+# backend/services/dedupe.py
+import hashlib
+import logging
+import random
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, or_
+from sqlmodel import Session, select
+
+from backend.models import JobFingerprint, JobFingerprintBand, JobPosting
+
+logger = logging.getLogger(__name__)
+
+# MinHash signature of NUM_PERM values, split into BANDS bands of ROWS rows
+# for LSH. Postings that share any band bucket become candidates; with 16x4 the
+# chance of becoming a candidate is ~50% at Jaccard 0.5 and >99% at 0.8.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.8
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures are persisted and must stay comparable across restarts
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+
+def shingles(text: str) -> set:
+    """Word unigrams and bigrams of the lowercased, tag-stripped text"""
+    words = _WORD_RE.findall(_TAG_RE.sub(" ", text.lower()))
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def minhash(text: str) -> List[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min((a * h + b) % _PRIME & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def band_buckets(signature: List[int]) -> List[int]:
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode("ascii"), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+    return buckets
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def posting_text(posting: JobPosting) -> str:
+    return f"{posting.title} {posting.company} {posting.description}"
+
+
+def _encode(signature: List[int]) -> str:
+    return ",".join(f"{value:x}" for value in signature)
+
+
+def _decode(value: str) -> List[int]:
+    return [int(part, 16) for part in value.split(",")]
+
+
+def find_near_duplicate(db: Session, signature: List[int]) -> Optional[int]:
+    """Return the canonical posting id of the most similar indexed posting, if any"""
+    buckets = band_buckets(signature)
+    candidate_ids = set(db.exec(
+        select(JobFingerprintBand.posting_id)
+        .where(or_(*[
+            and_(JobFingerprintBand.band == band, JobFingerprintBand.bucket == bucket)
+            for band, bucket in enumerate(buckets)
+        ]))
+    ).all())
+    if not candidate_ids:
+        return None
+
+    candidates = db.exec(
+        select(JobFingerprint, JobPosting.duplicate_of)
+        .join(JobPosting, JobPosting.id == JobFingerprint.posting_id)
+        .where(JobFingerprint.posting_id.in_(candidate_ids))
+    ).all()
+
+    best = None
+    for candidate, duplicate_of in candidates:
+        score = similarity(signature, _decode(candidate.signature))
+        if score >= SIMILARITY_THRESHOLD and (best is None or score > best[0]):
+            best = (score, duplicate_of or candidate.posting_id)
+    return best[1] if best else None
+
+
+def forget_fingerprints(db: Session, posting_ids: List[int]):
+    """
+    Drop the signatures of postings whose content changed, so fingerprint_pending
+    indexes and groups them again. Postings grouped under a changed one lose
+    theirs too: they are regrouped against its new content rather than staying
+    under a posting they may no longer resemble. Does not commit.
+    """
+    if not posting_ids:
+        return
+    members = db.exec(select(JobPosting.id).where(JobPosting.duplicate_of.in_(posting_ids))).all()
+    forgotten = list(posting_ids) + list(members)
+    db.execute(delete(JobFingerprintBand).where(JobFingerprintBand.posting_id.in_(forgotten)))
+    db.execute(delete(JobFingerprint).where(JobFingerprint.posting_id.in_(forgotten)))
+
+
+def fingerprint_pending(db: Session, limit: int = 1000, posting_ids: Optional[List[int]] = None) -> Dict[str, int]:
+    """
+    Fingerprint postings that are not indexed yet (new, or changed since; see
+    forget_fingerprints) and group near-duplicates under the earliest matching
+    posting (JobPosting.duplicate_of). With `posting_ids`, only those postings
+    and the ones grouped under them are looked at, so a scrape does not pay for
+    an older backlog (see backfill_fingerprints).
+    """
+    query = (
+        select(JobPosting)
+        .outerjoin(JobFingerprint, JobFingerprint.posting_id == JobPosting.id)
+        .where(JobFingerprint.posting_id == None)  # noqa: E711
+    )
+    if posting_ids is not None:
+        if not posting_ids:
+            return {"indexed": 0, "duplicates": 0}
+        query = query.where(or_(JobPosting.id.in_(posting_ids), JobPosting.duplicate_of.in_(posting_ids)))
+    pending = db.exec(query.order_by(JobPosting.id).limit(limit)).all()
+
+    counts = {"indexed": 0, "duplicates": 0}
+    for posting in pending:
+        signature = minhash(posting_text(posting))
+        canonical_id = find_near_duplicate(db, signature)
+        if canonical_id is not None and canonical_id != posting.id:
+            posting.duplicate_of = canonical_id
+            db.add(posting)
+            counts["duplicates"] += 1
+        elif posting.duplicate_of is not None:
+            # Changed content no longer matches the group it was in
+            posting.duplicate_of = None
+            db.add(posting)
+
+        db.add(JobFingerprint(posting_id=posting.id, signature=_encode(signature)))
+        for band, bucket in enumerate(band_buckets(signature)):
+            db.add(JobFingerprintBand(posting_id=posting.id, band=band, bucket=bucket))
+        # Flush so later postings in this batch can match against this one
+        db.flush()
+        counts["indexed"] += 1
+
+    db.commit()
+    if counts["indexed"]:
+        logger.info(f"Fingerprinted job postings: {counts}")
+    return counts
+
+
+def backfill_fingerprints(db: Session, batch_size: int = 1000) -> int:
+    """Fingerprint every posting stored before near-duplicate grouping existed, in batches"""
+    total = 0
+    while True:
+        indexed = fingerprint_pending(db, limit=batch_size)["indexed"]
+        total += indexed
+        if indexed < batch_size:
+            return total
+
+
+def duplicate_group(db: Session, posting_id: int) -> List[JobPosting]:
+    """The canonical posting followed by every posting grouped under it"""
+    posting = db.get(JobPosting, posting_id)
+    if posting is None:
+        return []
+    canonical_id = posting.duplicate_of or posting.id
+    return db.exec(
+        select(JobPosting)
+        .where(or_(JobPosting.id == canonical_id, JobPosting.duplicate_of == canonical_id))
+        .order_by(JobPosting.id)
+    ).all()
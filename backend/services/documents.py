@@ -0,0 +1,384 @@
+# backend/services/documents.py
+"""
+PDF and DOCX export of cover letters and tailored resumes.
+
+Layout is CPU-bound, so documents are rendered in a process pool
+(DOCUMENT_WORKERS) and never on the event loop. Outputs are cached on disk
+under a hash of the format and the document content: an unchanged letter is
+rendered once, identical concurrent requests share one render, and the hash is
+the response's ETag. The cache is bounded by EXPORT_CACHE_MAX_BYTES, least
+recently served files going first.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import textwrap
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from backend.database import engine
+from backend.models import Application, Resume
+from backend.services.memo import content_hash
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_WORKERS = int(os.getenv("DOCUMENT_WORKERS", "2"))
+EXPORT_DIR = os.getenv("EXPORT_DIR", "data/exports")
+EXPORT_CACHE_MAX_BYTES = int(os.getenv("EXPORT_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+EXPORT_BATCH_MAX = int(os.getenv("EXPORT_BATCH_MAX", "100"))
+# Documents built at once per ZIP export; a batch's letters share the caller's LLM_MAX_PER_USER slots
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+# Bump when the layout changes so cached outputs are not reused
+RENDER_VERSION = "1"
+PRUNE_EVERY = 50  # renders between cache size checks
+
+FORMATS = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
+_BULLET_RE = re.compile(r"^\s*[-*•·▪◦]\s+")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_rendering: Dict[str, asyncio.Future] = {}
+_counters = {"hits": 0, "renders": 0, "coalesced": 0, "errors": 0, "pruned": 0}
+
+
+class ExportError(Exception):
+    """The document could not be built or rendered"""
+
+
+@dataclass(frozen=True)
+class DocumentSpec:
+    title: str
+    subtitle: str
+    body: str  # plain text: blank lines separate paragraphs, "- " starts a bullet
+    filename: str  # without extension
+
+    def key(self, fmt: str) -> str:
+        return content_hash(json.dumps([RENDER_VERSION, fmt, self.title, self.subtitle, self.body]))
+
+
+@dataclass
+class RenderedDocument:
+    key: str
+    path: str
+    media_type: str
+    filename: str
+
+
+def slugify(text: str) -> str:
+    return _SLUG_RE.sub("-", (text or "").lower()).strip("-")[:40]
+
+
+def _is_heading(line: str) -> bool:
+    words = line.rstrip(":")
+    return 0 < len(words) <= 40 and (words.isupper() or (line.endswith(":") and len(words.split()) <= 4))
+
+
+def _blocks(body: str) -> List[Tuple[str, str]]:
+    """("heading" | "bullet" | "paragraph", text) in order; wrapped lines of a paragraph are joined"""
+    blocks: List[Tuple[str, str]] = []
+    paragraph: List[str] = []
+
+    def flush():
+        if paragraph:
+            blocks.append(("paragraph", " ".join(paragraph)))
+            paragraph.clear()
+
+    for line in textwrap.dedent(body).strip().splitlines():
+        line = line.strip()
+        if not line:
+            flush()
+        elif _BULLET_RE.match(line):
+            flush()
+            blocks.append(("bullet", _BULLET_RE.sub("", line)))
+        elif _is_heading(line):
+            flush()
+            blocks.append(("heading", line.rstrip(":")))
+        else:
+            paragraph.append(line)
+    flush()
+    return blocks
+
+
+def _render_pdf(spec: DocumentSpec, path: str):
+    from xml.sax.saxutils import escape
+
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    story = [Paragraph(escape(spec.title), styles["Title"])]
+    if spec.subtitle:
+        story.append(Paragraph(escape(spec.subtitle), styles["Italic"]))
+    story.append(Spacer(1, 0.2 * inch))
+    for kind, text in _blocks(spec.body):
+        if kind == "heading":
+            story.append(Paragraph(escape(text), styles["Heading3"]))
+        elif kind == "bullet":
+            story.append(Paragraph(escape(text), styles["BodyText"], bulletText="•"))
+        else:
+            story.append(Paragraph(escape(text), styles["BodyText"]))
+            story.append(Spacer(1, 0.08 * inch))
+    SimpleDocTemplate(path, pagesize=LETTER, title=spec.title, leftMargin=inch, rightMargin=inch,
+                      topMargin=0.8 * inch, bottomMargin=0.8 * inch).build(story)
+
+
+def _render_docx(spec: DocumentSpec, path: str):
+    import docx
+
+    document = docx.Document()
+    document.core_properties.title = spec.title
+    document.add_heading(spec.title, level=1)
+    if spec.subtitle:
+        document.add_paragraph().add_run(spec.subtitle).italic = True
+    for kind, text in _blocks(spec.body):
+        if kind == "heading":
+            document.add_heading(text, level=2)
+        elif kind == "bullet":
+            document.add_paragraph(text, style="List Bullet")
+        else:
+            document.add_paragraph(text)
+    document.save(path)
+
+
+_RENDERERS = {"pdf": _render_pdf, "docx": _render_docx}
+
+
+def output_path(key: str, fmt: str) -> str:
+    return os.path.join(EXPORT_DIR, key[:2], f"{key}.{fmt}")
+
+
+def render_file(spec: DocumentSpec, fmt: str, path: str):
+    """Runs in the pool: render to a temporary file, then move it into place atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        _RENDERERS[fmt](spec, temp)
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=DOCUMENT_WORKERS)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def prune(max_bytes: int = EXPORT_CACHE_MAX_BYTES) -> int:
+    """Delete the least recently served outputs until the cache fits max_bytes"""
+    files = []
+    for root, _, names in os.walk(EXPORT_DIR):
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    excess = sum(size for _, size, _ in files) - max_bytes
+    removed = 0
+    for _, size, path in sorted(files):
+        if excess <= 0:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        excess -= size
+        removed += 1
+    return removed
+
+
+async def render(spec: DocumentSpec, fmt: str) -> RenderedDocument:
+    """The cached output for `spec`, rendering it in the pool on a miss"""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unsupported format: {fmt}")
+    key = spec.key(fmt)
+    path = output_path(key, fmt)
+    try:
+        # The mtime orders files for pruning
+        os.utime(path)
+        _counters["hits"] += 1
+    except FileNotFoundError:
+        pending = _rendering.get(key)
+        if pending is None:
+            pending = asyncio.get_running_loop().run_in_executor(_executor(), render_file, spec, fmt, path)
+            _rendering[key] = pending
+            pending.add_done_callback(lambda _: _rendering.pop(key, None))
+            _counters["renders"] += 1
+            if _counters["renders"] % PRUNE_EVERY == 0:
+                asyncio.get_running_loop().run_in_executor(None, _prune_in_background)
+        else:
+            _counters["coalesced"] += 1
+        try:
+            # Shielded: one caller going away must not cancel a render others wait on
+            await asyncio.shield(pending)
+        except ImportError as e:
+            _counters["errors"] += 1
+            raise ExportError(f"{fmt.upper()} export requires {e.name}") from e
+        except Exception as e:
+            _counters["errors"] += 1
+            raise ExportError(f"Rendering failed: {e}") from e
+    return RenderedDocument(key=key, path=path, media_type=FORMATS[fmt], filename=f"{spec.filename}.{fmt}")
+
+
+def _prune_in_background():
+    try:
+        _counters["pruned"] += prune()
+    except Exception as e:
+        logger.warning(f"Export cache prune failed: {e}")
+
+
+async def cover_letter_document(application_id: int, resume_id: Optional[int] = None,
+                                user: str = "anonymous", fallback: bool = True) -> Optional[DocumentSpec]:
+    """
+    The application's cover letter (the kept draft, or written now); None if it
+    does not exist. With fallback=False an LLM failure raises ExportError
+    instead of exporting the template letter.
+    """
+    from backend.services.cover_letter import generate_cover_letter
+    from backend.services.llm import LLMError
+
+    with Session(engine) as db:
+        application = db.get(Application, application_id)
+        if application is None:
+            return None
+        try:
+            letter = await generate_cover_letter(application_id, db, resume_id, user, fallback=fallback)
+        except LLMError as e:
+            raise ExportError(f"Cover letter could not be written: {e}") from e
+        return DocumentSpec(
+            title=f"Cover Letter: {application.title}",
+            subtitle=application.company,
+            body=letter,
+            filename=f"cover-letter-{slugify(application.company)}-{slugify(application.title)}-{application.id}",
+        )
+
+
+def tailored_resume_document(resume_id: int, application_id: int) -> Optional[DocumentSpec]:
+    """The resume led by the skills this job asks for; None if either does not exist"""
+    from backend.services.cover_letter import matching_skills
+
+    with Session(engine) as db:
+        resume = db.get(Resume, resume_id)
+        application = db.get(Application, application_id)
+        if resume is None or application is None:
+            return None
+        skills = matching_skills(application, db, resume_id)
+        body = f"KEY SKILLS\n{', '.join(skills)}\n\n{resume.content}" if skills else resume.content
+        return DocumentSpec(
+            title=resume.name,
+            subtitle=f"{application.title}, {application.company}",
+            body=body,
+            filename=f"resume-{slugify(application.company)}-{slugify(application.title)}-{application.id}",
+        )
+
+
+async def build_document(kind: str, application_id: int, resume_id: Optional[int] = None,
+                         user: str = "anonymous", fallback: bool = True) -> Optional[DocumentSpec]:
+    if kind == "cover_letter":
+        return await cover_letter_document(application_id, resume_id, user, fallback)
+    if kind == "resume":
+        if resume_id is None:
+            raise ExportError("A tailored resume needs a resume_id")
+        return await asyncio.to_thread(tailored_resume_document, resume_id, application_id)
+    raise ExportError(f"Unknown document kind: {kind}")
+
+
+class _ZipStream:
+    """Write-only file for ZipFile whose bytes are drained as they are produced"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def export_zip(kind: str, fmt: str, application_ids: List[int], resume_id: Optional[int] = None,
+                     user: str = "anonymous"):
+    """
+    Build and render documents, EXPORT_CONCURRENCY at a time, yielding a ZIP
+    stream as each one finishes. Failures, including letters the LLM could not
+    write, are listed in errors.txt instead of failing the whole export; the
+    template letter is used only when no LLM is configured at all.
+    """
+    from backend.services.llm import llm
+
+    slots = asyncio.Semaphore(EXPORT_CONCURRENCY)
+    fallback = not llm.enabled
+
+    async def one(application_id: int):
+        try:
+            async with slots:
+                spec = await build_document(kind, application_id, resume_id, user, fallback)
+                if spec is None:
+                    return application_id, None, "not found"
+                return application_id, await render(spec, fmt), None
+        except ExportError as e:
+            return application_id, None, str(e)
+        except Exception as e:
+            logger.warning(f"Export of application {application_id} failed: {e}")
+            return application_id, None, f"unexpected error: {e}"
+
+    jobs = [asyncio.create_task(one(application_id)) for application_id in dict.fromkeys(application_ids)]
+    stream = _ZipStream()
+    errors = []
+    try:
+        # Documents are already compressed (PDF streams, DOCX is itself a ZIP), so they are stored as is
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+            for job in asyncio.as_completed(jobs):
+                application_id, document, error = await job
+                if document is None:
+                    errors.append(f"Application {application_id}: {error}")
+                    continue
+                archive.writestr(document.filename, await asyncio.to_thread(_read, document.path))
+                yield stream.drain()
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors) + "\n")
+        yield stream.drain()
+    finally:
+        for job in jobs:
+            job.cancel()
+
+
+def export_stats() -> dict:
+    return {**_counters, "rendering": len(_rendering), "workers": DOCUMENT_WORKERS}
@@ -0,0 +1,152 @@
+# backend/services/drafts.py
+"""
+Speculative cover letter drafts (opt-in with COVER_LETTER_DRAFTS=true).
+
+Creating an application, or moving one to "applied", queues a low-priority
+task that writes its cover letter ahead of time, so opening the letter later
+reads it from the database instead of waiting on the LLM. Drafts only use
+spare capacity: none are queued while DRAFT_MAX_BACKLOG of them are already
+waiting, a draft task steps back whenever other tasks are waiting or enough
+LLM tasks are running (counted in the shared task table, so every worker
+process sees the same load), and one that could not run within DRAFT_MAX_AGE
+is dropped. Drafts share one LLM "user", so they never hold more than
+LLM_MAX_PER_USER slots or spend a visitor's token budget.
+
+A kept letter is tied to a hash of what it was written from (the posting and
+the resume), so editing either one makes the next request write it again.
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from backend.database import dialect_insert
+from backend.models import Application, CoverLetterDraft, Resume, Task, TaskStatus
+from backend.services.llm import llm
+from backend.services.memo import content_hash
+from backend.services.tasks import cancel, enqueue, queued_count, running_count
+
+logger = logging.getLogger(__name__)
+
+COVER_LETTER_DRAFTS = os.getenv("COVER_LETTER_DRAFTS", "false").lower() == "true"
+DRAFT_PRIORITY = -10  # below every interactive task (those use 0 and up)
+DRAFT_MAX_BACKLOG = int(os.getenv("DRAFT_MAX_BACKLOG", "20"))
+DRAFT_RETRY_DELAY = 60  # seconds a busy system pushes a draft back
+DRAFT_MAX_AGE = timedelta(hours=int(os.getenv("DRAFT_MAX_AGE_HOURS", "24")))
+DRAFT_USER = "speculative"
+# Task kinds that call the LLM; a draft waits while half of LLM_MAX_CONCURRENCY of them run
+LLM_TASK_KINDS = ["optimize_resume", "cover_letter", "cover_letter_draft"]
+
+
+def inputs_hash(db: Session, application: Application, resume_id: Optional[int]) -> str:
+    """Hash of what a letter is written from: the posting's text and the resume's content"""
+    resume = db.get(Resume, resume_id) if resume_id is not None else None
+    resume_hash = (resume.content_hash or content_hash(resume.content)) if resume is not None else None
+    return content_hash(json.dumps(
+        [application.title, application.company, application.description, resume_id, resume_hash]
+    ))
+
+
+def stored_draft(db: Session, application_id: int, resume_id: Optional[int] = None) -> Optional[str]:
+    """
+    The kept letter for an application, if it is written, used the requested
+    resume and neither the posting nor that resume has changed since
+    """
+    draft = db.exec(select(CoverLetterDraft).where(CoverLetterDraft.application_id == application_id)).first()
+    if draft is None or draft.content is None:
+        return None
+    if resume_id is not None and draft.resume_id != resume_id:
+        return None
+    application = db.get(Application, application_id)
+    if application is None or draft.inputs_hash != inputs_hash(db, application, draft.resume_id):
+        return None
+    return draft.content
+
+
+def _upsert(db: Session, application_id: int, **values):
+    now = datetime.utcnow()
+    insert = dialect_insert(db.get_bind())
+    stmt = insert(CoverLetterDraft.__table__).values(application_id=application_id, created_at=now,
+                                                     updated_at=now, **values)
+    db.execute(stmt.on_conflict_do_update(index_elements=["application_id"], set_={**values, "updated_at": now}))
+    db.commit()
+
+
+def save_draft(db: Session, application_id: int, resume_id: Optional[int], content: str):
+    """Keep a letter written by the LLM (template fallbacks are cheap and not kept)"""
+    application = db.get(Application, application_id)
+    _upsert(db, application_id, resume_id=resume_id, content=content, task_id=None,
+            inputs_hash=inputs_hash(db, application, resume_id) if application is not None else None)
+
+
+def drop_draft_task(db: Session, application_id: int):
+    """The letter is being written on request: a queued speculative task would only duplicate it"""
+    draft = db.exec(select(CoverLetterDraft).where(CoverLetterDraft.application_id == application_id)).first()
+    if draft is not None and draft.task_id is not None and cancel(db, draft.task_id):
+        logger.info(f"Cancelled speculative cover letter task {draft.task_id} for application {application_id}")
+
+
+def delete_draft(db: Session, application_id: int):
+    """Forget the kept letter (and cancel its pending task) so it can be drafted again"""
+    draft = db.exec(select(CoverLetterDraft).where(CoverLetterDraft.application_id == application_id)).first()
+    if draft is not None:
+        if draft.task_id is not None:
+            cancel(db, draft.task_id)
+        db.delete(draft)
+        db.commit()
+
+
+def discard_placeholder(db: Session, application_id: int):
+    """Remove the row of a draft that was never written, so the letter can be drafted again"""
+    db.execute(delete(CoverLetterDraft).where(CoverLetterDraft.application_id == application_id,
+                                              CoverLetterDraft.content.is_(None)))
+    db.commit()
+
+
+def _pending(db: Session, task_id: Optional[int]) -> bool:
+    if task_id is None:
+        return False
+    task = db.get(Task, task_id)
+    return task is not None and task.status in (TaskStatus.QUEUED, TaskStatus.RUNNING)
+
+
+def schedule_draft(db: Session, application: Application) -> Optional[int]:
+    """
+    Queue a speculative letter for a new or just-applied application. Returns
+    the task id, or None when drafts are off, a current one exists or is
+    pending, or the queue is busy.
+    """
+    if not COVER_LETTER_DRAFTS or not llm.enabled:
+        return None
+    existing = db.exec(select(CoverLetterDraft).where(CoverLetterDraft.application_id == application.id)).first()
+    # A placeholder whose task ended without writing the letter does not count
+    if existing is not None and (stored_draft(db, application.id) is not None or _pending(db, existing.task_id)):
+        return None
+    if queued_count(db, kind="cover_letter_draft") >= DRAFT_MAX_BACKLOG:
+        logger.info(f"Draft backlog full, no speculative cover letter for application {application.id}")
+        return None
+
+    # No resume is chosen yet: use the most recently uploaded one
+    resume_id = db.exec(select(Resume.id).order_by(Resume.created_at.desc(), Resume.id.desc()).limit(1)).first()
+    payload = {"application_id": application.id, "resume_id": resume_id, "queued_at": datetime.utcnow()}
+    task = enqueue(db, "cover_letter_draft", payload, priority=DRAFT_PRIORITY, max_attempts=1)
+    _upsert(db, application.id, resume_id=resume_id, task_id=task.id)
+    return task.id
+
+
+def system_busy(db: Session, task_id: Optional[int] = None) -> Optional[str]:
+    """
+    Why a speculative task should wait, or None when there is spare capacity.
+    Read from the task table rather than this process's gateway, so the answer
+    is the same in every web and worker process; `task_id` (the asking task)
+    is not counted.
+    """
+    if queued_count(db, min_priority=DRAFT_PRIORITY):
+        return "Other tasks are waiting"
+    if running_count(db, LLM_TASK_KINDS, exclude_id=task_id) >= max(1, llm.max_concurrency // 2):
+        return "LLM tasks are busy"
+    return None
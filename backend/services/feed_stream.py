@@ -0,0 +1,191 @@
+# backend/services/feed_stream.py
+"""
+Streaming RSS/Atom parser.
+
+Feeds are parsed incrementally with ElementTree's pull parser: each <item> /
+<entry> is turned into a job dict as soon as its end tag arrives and is then
+dropped, so memory stays flat regardless of feed size. Parsing stops as soon as
+the entry limit or an already-seen GUID is reached. Malformed documents raise
+FeedParseError so callers can fall back to feedparser, which is slower but
+tolerant of broken markup.
+"""
+import logging
+import os
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator, List, Optional
+
+from feedparser.sanitizer import _sanitize_html
+
+from backend.services.keywords import keyword_matcher
+
+logger = logging.getLogger(__name__)
+
+MAX_FEED_BYTES = int(os.getenv("MAX_FEED_BYTES", str(5 * 1024 * 1024)))
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ENTRY_TAGS = {"item", f"{_ATOM}entry", "{http://purl.org/rss/1.0/}item"}
+_TAG_RE = re.compile(r"<[a-zA-Z/!]")
+
+
+class FeedParseError(Exception):
+    """The document is not well-formed XML"""
+
+
+class FeedTooLarge(Exception):
+    """The document is larger than the configured byte limit"""
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1] if "}" in tag else tag.split(":")[-1]
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return (element.text or "").strip() if element is not None else ""
+
+
+def _parse_date(value: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)  # RSS: RFC 822
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))  # Atom: RFC 3339
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _sanitize(html: str) -> str:
+    # Same sanitizer feedparser applies, so both parse paths store identical markup
+    return _sanitize_html(html, "utf-8", "text/html") if _TAG_RE.search(html) else html
+
+
+def entry_to_job(entry: ET.Element, feed_url: str) -> dict:
+    """Normalize one RSS <item> or Atom <entry> into the job dict used by the scraper"""
+    fields = {}
+    link = ""
+    for child in entry:
+        name = _local(child.tag)
+        if name == "link":
+            # Atom links carry the URL in href; prefer rel="alternate"
+            href = child.get("href")
+            if href is None:
+                link = link or _text(child)
+            elif child.get("rel", "alternate") == "alternate" or not link:
+                link = href
+        elif name == "author" and len(child):
+            fields.setdefault("author", _text(child.find(f"{_ATOM}name")))
+        elif name not in fields:
+            fields[name] = _text(child)
+
+    description = (
+        fields.get("encoded") or fields.get("description") or fields.get("summary") or fields.get("content") or ""
+    )
+    published = _parse_date(
+        fields.get("pubDate") or fields.get("published") or fields.get("updated") or fields.get("date") or ""
+    )
+    return {
+        "title": fields.get("title") or "No Title",
+        "company": fields.get("company") or fields.get("author") or fields.get("creator") or "Unknown",
+        "location": fields.get("location") or "Remote",
+        "description": _sanitize(description),
+        "url": link,
+        "guid": fields.get("guid") or fields.get("id") or link,
+        "source": feed_url,
+        "published_at": published or datetime.utcnow(),
+    }
+
+
+class FeedStreamParser:
+    """
+    Push parser: feed() it byte chunks and collect the jobs it returns.
+    `done` turns true once the limit or a GUID from `stop_guids` is reached;
+    the caller should stop reading then.
+    """
+
+    def __init__(self, feed_url: str, keywords: str = "", limit: Optional[int] = None,
+                 stop_guids: Optional[Iterable[str]] = None, max_bytes: int = MAX_FEED_BYTES):
+        self.feed_url = feed_url
+        self.matcher = keyword_matcher(keywords)
+        self.limit = limit
+        self.stop_guids = set(stop_guids or ())
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.count = 0
+        self.done = False
+        self.truncated = False  # stopped at `limit`, so entries after it were never read
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: List[ET.Element] = []
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        if self.done:
+            return []
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            self.done = True
+            raise FeedTooLarge(f"Feed exceeds {self.max_bytes} bytes")
+        try:
+            self._parser.feed(chunk)
+        except ET.ParseError as e:
+            raise FeedParseError(str(e)) from e
+        return self._drain()
+
+    def close(self) -> List[dict]:
+        if self.done:
+            return []
+        try:
+            self._parser.close()
+        except ET.ParseError as e:
+            raise FeedParseError(str(e)) from e
+        jobs = self._drain()
+        self.done = True
+        return jobs
+
+    def _drain(self) -> List[dict]:
+        jobs = []
+        try:
+            events = list(self._parser.read_events())
+        except ET.ParseError as e:
+            raise FeedParseError(str(e)) from e
+
+        for event, element in events:
+            if event == "start":
+                self._stack.append(element)
+                continue
+            self._stack.pop()
+            if element.tag not in _ENTRY_TAGS or self.done:
+                continue
+
+            job = entry_to_job(element, self.feed_url)
+            # Detach the finished entry so the tree never grows
+            if self._stack:
+                self._stack[-1].remove(element)
+
+            if job["guid"] in self.stop_guids:
+                self.done = True
+                break
+            if self.matcher and not self.matcher.matches(f"{job['title']} {job['description']}"):
+                continue
+            jobs.append(job)
+            self.count += 1
+            if self.limit and self.count >= self.limit:
+                self.done = self.truncated = True
+                break
+        return jobs
+
+
+def iter_feed_jobs(chunks: Iterable[bytes], feed_url: str, keywords: str = "", limit: Optional[int] = None,
+                   stop_guids: Optional[Iterable[str]] = None, max_bytes: int = MAX_FEED_BYTES) -> Iterator[dict]:
+    """Yield job dicts from an iterable of byte chunks, stopping early when possible"""
+    parser = FeedStreamParser(feed_url, keywords, limit, stop_guids, max_bytes)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.close()
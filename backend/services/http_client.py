@@ -0,0 +1,237 @@
+# backend/services/http_client.py
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by every outbound request in the process
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.0"))
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10.0"))
+HTTP2 = os.getenv("HTTP2", "false").lower() == "true"
+
+# Retries: transport errors and 429/5xx, full jitter between attempts
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+RETRY_BASE = float(os.getenv("HTTP_RETRY_BASE", "0.25"))
+RETRY_MAX = float(os.getenv("HTTP_RETRY_MAX", "4.0"))
+_RETRY_STATUSES = {429, 502, 503, 504}
+
+# Circuit breaker: after BREAKER_THRESHOLD consecutive failures a host is
+# skipped for BREAKER_COOLDOWN seconds, then one trial request decides
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", "60"))
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised without touching the network while a host's breaker is open"""
+
+
+@dataclass
+class HostMetrics:
+    requests: int = 0
+    failures: int = 0
+    retries: int = 0
+    short_circuited: int = 0
+    total_latency: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["total_latency"] = round(self.total_latency, 3)
+        completed = self.requests - self.short_circuited
+        data["avg_latency_ms"] = round(self.total_latency / completed * 1000, 1) if completed else None
+        return data
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open after `cooldown`"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.threshold:
+            # A failed trial re-opens the breaker for another cooldown
+            self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """The trial ended without an outcome (e.g. it was cancelled): let the next request try"""
+        self._trial_in_flight = False
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("HTTP2=true but the h2 package is not installed, using HTTP/1.1")
+        return False
+
+
+def _retry_delay(attempt: int) -> float:
+    return random.uniform(0, min(RETRY_MAX, RETRY_BASE * 2 ** attempt))
+
+
+class SharedHttpClient:
+    """
+    One pooled httpx.AsyncClient for the whole process, plus per-host circuit
+    breakers and metrics. The underlying client is bound to an event loop, so it
+    is rebuilt if used from a different loop (e.g. a standalone worker run);
+    breaker state and metrics are kept across rebuilds.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._metrics: Dict[str, HostMetrics] = {}
+
+    def _httpx(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                http2=HTTP2 and _http2_available(),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+                headers={"User-Agent": "JobHunter/1.0 (+https://github.com/skmudabbir/JobHunter)"},
+            )
+            self._loop = loop
+        return self._client
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker()
+        return self._breakers[host]
+
+    def metrics(self, host: str) -> HostMetrics:
+        if host not in self._metrics:
+            self._metrics[host] = HostMetrics()
+        return self._metrics[host]
+
+    async def request(self, method: str, url: str, retries: int = MAX_RETRIES, stream: bool = False,
+                      **kwargs) -> httpx.Response:
+        """
+        Send a request through the shared pool. Raises CircuitOpenError while the
+        host is failing, otherwise behaves like httpx.AsyncClient.request.
+        4xx responses count as healthy: the host answered.
+        With stream=True the body is not read; use `stream()` to have it closed.
+        """
+        host = urlparse(url).netloc.lower()
+        breaker, metrics = self.breaker(host), self.metrics(host)
+        metrics.requests += 1
+        if not breaker.allow():
+            metrics.short_circuited += 1
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        client = self._httpx()
+        started = time.perf_counter()
+        attempt = 0
+        settled = False  # an outcome was recorded on the breaker
+        try:
+            while True:
+                try:
+                    response = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+                    if response.status_code not in _RETRY_STATUSES and response.status_code < 500:
+                        breaker.record_success()
+                        settled = True
+                        return response
+                    error = f"HTTP {response.status_code}"
+                    if stream and attempt < retries:
+                        await response.aclose()
+                except httpx.TransportError as e:
+                    response = None
+                    error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                    if attempt >= retries:
+                        breaker.record_failure()
+                        settled = True
+                        metrics.failures += 1
+                        metrics.last_error = error
+                        raise
+
+                if attempt >= retries:
+                    breaker.record_failure()
+                    settled = True
+                    metrics.failures += 1
+                    metrics.last_error = error
+                    return response
+                attempt += 1
+                metrics.retries += 1
+                await asyncio.sleep(_retry_delay(attempt))
+        finally:
+            if not settled:
+                # Cancelled or failed outside the transport: a half-open trial must not hold the host shut
+                breaker.release_trial()
+            metrics.total_latency += time.perf_counter() - started
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Like httpx.AsyncClient.stream: headers are read, the body is left to the caller"""
+        response = await self.request(method, url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    def stats(self) -> dict:
+        return {
+            host: {**metrics.as_dict(), "circuit": self.breaker(host).state}
+            for host, metrics in sorted(self._metrics.items())
+        }
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+
+
+http_client = SharedHttpClient()
@@ -0,0 +1,498 @@
+# backend/services/ingest.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from sqlmodel import Session, select
+
+from backend.models import FeedState, JobPosting
+from backend.services.dedupe import fingerprint_pending
+from backend.services.feed_stream import FeedParseError, FeedStreamParser, FeedTooLarge
+from backend.services.http_client import CONNECT_TIMEOUT, SharedHttpClient, http_client
+from backend.services.pipeline import Pipeline, Stage, StageMetrics
+from backend.services.keywords import keyword_matcher
+from backend.services.job_store import dedup_key, upsert_job_postings
+from backend.services.scraper import parse_feed
+from backend.services.vector_index import job_index
+
+logger = logging.getLogger(__name__)
+
+# Concurrency limits for feed ingestion
+MAX_CONCURRENT_FEEDS = int(os.getenv("INGEST_MAX_CONCURRENCY", "16"))
+MAX_CONCURRENT_PER_HOST = int(os.getenv("INGEST_MAX_PER_HOST", "2"))
+FETCH_TIMEOUT = float(os.getenv("INGEST_FETCH_TIMEOUT", "10.0"))
+# Keep the shared client's short connect timeout; only reads may take FETCH_TIMEOUT
+_FETCH_TIMEOUTS = httpx.Timeout(FETCH_TIMEOUT, connect=CONNECT_TIMEOUT)
+# Pipeline stage concurrency (fetching uses MAX_CONCURRENT_FEEDS)
+NORMALIZE_CONCURRENCY = int(os.getenv("INGEST_NORMALIZE_CONCURRENCY", "2"))
+PERSIST_CONCURRENCY = int(os.getenv("INGEST_PERSIST_CONCURRENCY", "1"))
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+# GUIDs remembered per feed for stopping early on already-seen entries
+SEEN_GUIDS = 200
+# Upper bound on how long one scrape waits for slow feeds
+SCRAPE_DEADLINE = float(os.getenv("SCRAPE_DEADLINE", "15.0"))
+
+
+@dataclass
+class FeedResult:
+    """Outcome of fetching and parsing a single feed"""
+    feed_url: str
+    jobs: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+    elapsed: float = 0.0
+    not_modified: bool = False  # 304 or identical body, nothing was parsed
+    skipped: int = 0  # entries dropped by the pipeline before persisting
+    # New validators and seen GUIDs for FeedState; applied only once the jobs are persisted
+    state_update: Optional[dict] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _HostLimiter:
+    """Global semaphore plus one semaphore per host"""
+
+    def __init__(self, total: int, per_host: int):
+        self._total = asyncio.Semaphore(total)
+        self._per_host = per_host
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    def for_host(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self._per_host)
+        return self._hosts[host]
+
+    @property
+    def total(self) -> asyncio.Semaphore:
+        return self._total
+
+
+def _conditional_headers(state: Optional[FeedState], filtered: bool) -> Dict[str, str]:
+    headers = {}
+    # Validators describe the whole feed; a keyword-filtered scrape needs the body even when
+    # it has not changed, since the entries it wants may never have been stored
+    if state is not None and not filtered:
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+    return headers
+
+
+async def _ingest_one(client: SharedHttpClient, limiter: _HostLimiter, feed_url: str,
+                      keywords: str, limit: Optional[int], state: Optional[FeedState],
+                      stop_at_seen: bool = False) -> FeedResult:
+    started = time.perf_counter()
+    filtered = bool(keyword_matcher(keywords))
+    seen = json.loads(state.last_entry_ids or "[]") if state is not None else []
+    parser = FeedStreamParser(feed_url, keywords, limit, stop_guids=seen if stop_at_seen else None)
+    hasher = hashlib.sha256()
+    body = bytearray()  # kept for the feedparser fallback, the feed is not fetched twice
+    jobs: List[dict] = []
+    complete = False  # whole body read, so its hash identifies the document
+    malformed = False  # the streaming parser gave up; the rest is read and handed to feedparser
+    try:
+        async with limiter.for_host(feed_url), limiter.total:
+            async with client.stream("GET", feed_url, headers=_conditional_headers(state, filtered),
+                                     timeout=_FETCH_TIMEOUTS) as response:
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    length = int(response.headers.get("content-length") or 0)
+                    if length > parser.max_bytes:
+                        raise FeedTooLarge(f"Feed exceeds {parser.max_bytes} bytes")
+                    # Without an ETag or Last-Modified the body hash is the only way to skip an
+                    # unchanged feed next time, so the rest of the body is still read (not parsed)
+                    # after an early stop
+                    drain = state is not None and not filtered and not (
+                        response.headers.get("etag") or response.headers.get("last-modified"))
+                    # Parse while downloading and hang up once the parser has what it needs.
+                    # Parsing runs in a thread so a large chunk never holds up the event loop.
+                    async for chunk in response.aiter_bytes():
+                        hasher.update(chunk)
+                        body.extend(chunk)
+                        if parser.done or malformed:
+                            if len(body) > parser.max_bytes:
+                                raise FeedTooLarge(f"Feed exceeds {parser.max_bytes} bytes")
+                            continue
+                        try:
+                            jobs.extend(await asyncio.to_thread(parser.feed, chunk))
+                        except FeedParseError as e:
+                            logger.info(f"Streaming parse failed for {feed_url} ({e}), falling back to feedparser")
+                            malformed = True
+                            continue
+                        if parser.done and not drain:
+                            break
+                    else:
+                        if not malformed:
+                            try:
+                                jobs.extend(await asyncio.to_thread(parser.close))
+                            except FeedParseError as e:
+                                logger.info(f"Streaming parse failed for {feed_url} ({e}), "
+                                            f"falling back to feedparser")
+                                malformed = True
+                        complete = True
+
+        now = datetime.utcnow()
+        if state is not None:
+            state.last_status = response.status_code
+            state.last_fetched_at = now
+
+        if response.status_code == 304:
+            return FeedResult(feed_url, not_modified=True, elapsed=time.perf_counter() - started)
+
+        if malformed:
+            # Malformed XML: let feedparser cope with the document already downloaded
+            jobs = await asyncio.to_thread(parse_feed, bytes(body), feed_url, keywords, limit)
+            return FeedResult(feed_url, jobs=jobs, elapsed=time.perf_counter() - started)
+
+        content_hash = hasher.hexdigest() if complete else None
+        update = None
+        if state is not None and not filtered:
+            if content_hash and state.content_hash == content_hash:
+                return FeedResult(feed_url, not_modified=True, elapsed=time.perf_counter() - started)
+            # Only a parse that saw every new entry may mark the feed as fetched: a 304 or the
+            # seen GUIDs would otherwise hide the entries after the limit for good
+            if not parser.truncated:
+                # Newest entries first; keep the old ids so an early stop still recognises them next time
+                guids = [job["guid"] for job in jobs]
+                update = {
+                    "etag": response.headers.get("etag", state.etag),
+                    "last_modified": response.headers.get("last-modified", state.last_modified),
+                    "content_hash": content_hash,
+                    "last_entry_ids": json.dumps(list(dict.fromkeys(guids + seen))[:SEEN_GUIDS]),
+                }
+        return FeedResult(feed_url, jobs=jobs, elapsed=time.perf_counter() - started, state_update=update)
+    except httpx.HTTPStatusError as e:
+        logger.warning(f"Failed to ingest {feed_url}: HTTP {e.response.status_code}")
+        return FeedResult(feed_url, error=f"HTTP {e.response.status_code}", elapsed=time.perf_counter() - started)
+    except Exception as e:
+        logger.warning(f"Failed to ingest {feed_url}: {e}")
+        return FeedResult(feed_url, error=str(e), elapsed=time.perf_counter() - started)
+
+
+async def iter_feeds(feed_urls: Iterable[str], keywords: str = "", limit: Optional[int] = None,
+                     client: Optional[SharedHttpClient] = None,
+                     states: Optional[Dict[str, FeedState]] = None,
+                     max_concurrency: int = MAX_CONCURRENT_FEEDS,
+                     max_per_host: int = MAX_CONCURRENT_PER_HOST,
+                     stop_at_seen: bool = False) -> AsyncIterator[FeedResult]:
+    """
+    Fetch and parse many feeds concurrently, yielding each FeedResult as soon as
+    its feed finishes. Closing the generator early cancels the remaining fetches.
+
+    When `states` maps feed URLs to FeedState rows, requests are conditional and
+    the rows are updated in place as each result is yielded; the caller is
+    responsible for committing them.
+    Requests go through the process-wide pooled client unless `client` is given.
+    With `stop_at_seen`, parsing stops at the first entry seen on the previous
+    fetch, so a poll only returns what is new.
+    """
+    urls = list(dict.fromkeys(u.strip() for u in feed_urls if u and u.strip()))
+    if not urls:
+        return
+
+    client = client or http_client
+    limiter = _HostLimiter(max_concurrency, max_per_host)
+    states = states or {}
+    tasks = [asyncio.create_task(_ingest_one(client, limiter, url, keywords, limit, states.get(url), stop_at_seen))
+             for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            apply_state_update(result, states.get(result.feed_url))
+            yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fetch_feeds(feed_urls: Iterable[str], keywords: str = "", limit: Optional[int] = None,
+                      deadline: Optional[float] = None, **kwargs) -> List[FeedResult]:
+    """
+    Collect results from iter_feeds. With a deadline (seconds), return whatever
+    finished in time; feeds still in flight are reported as timed out.
+    """
+    urls = list(dict.fromkeys(u.strip() for u in feed_urls if u and u.strip()))
+    results: List[FeedResult] = []
+
+    async def _collect():
+        async for result in iter_feeds(urls, keywords, limit, **kwargs):
+            results.append(result)
+
+    try:
+        await asyncio.wait_for(_collect(), timeout=deadline)
+    except asyncio.TimeoutError:
+        finished = {r.feed_url for r in results}
+        results.extend(FeedResult(url, error="Timed out") for url in urls if url not in finished)
+    return results
+
+
+def split_feed_urls(value: str) -> List[str]:
+    """Split a form value holding one or more feed URLs (comma or whitespace separated)"""
+    return [u for u in value.replace(",", " ").split() if u]
+
+
+def load_feed_states(db: Session, feed_urls: Iterable[str]) -> Dict[str, FeedState]:
+    """Fetch (or create, unsaved) the FeedState row for each feed URL"""
+    urls = list(dict.fromkeys(feed_urls))
+    existing = db.exec(select(FeedState).where(FeedState.feed_url.in_(urls))).all()
+    states = {state.feed_url: state for state in existing}
+    return {url: states.get(url) or FeedState(feed_url=url) for url in urls}
+
+
+def apply_state_update(result: FeedResult, state: Optional[FeedState]):
+    """Record a feed's new validators once its jobs are safely stored"""
+    if state is None or not result.state_update:
+        return
+    for key, value in result.state_update.items():
+        setattr(state, key, value)
+    state.updated_at = datetime.utcnow()
+
+
+def save_feed_states(db: Session, states: Dict[str, FeedState]):
+    """Persist FeedState rows for feeds that were actually fetched"""
+    for state in states.values():
+        if state.last_fetched_at is not None:
+            db.add(state)
+    db.commit()
+
+
+# Cumulative per-stage counters for every ingest run in this process
+PIPELINE_METRICS: Dict[str, StageMetrics] = {}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_LINK_SCHEMES = {"http", "https"}
+
+
+def _normalize(result: FeedResult) -> FeedResult:
+    """Collapse whitespace in short fields, drop unsafe links and compute each job's dedup key"""
+    for job in result.jobs:
+        for key in ("title", "company", "location"):
+            if isinstance(job.get(key), str):
+                job[key] = _WHITESPACE_RE.sub(" ", job[key]).strip()
+        url = (job.get("url") or "").strip()
+        # Links are rendered as hrefs: anything but http(s) (javascript:, data:, ...) is dropped
+        job["url"] = url if urlparse(url).scheme.lower() in _LINK_SCHEMES else ""
+        job["dedup_key"] = dedup_key(job)
+    return result
+
+
+def _drop(result: FeedResult, keep) -> FeedResult:
+    kept = [job for job in result.jobs if keep(job)]
+    result.skipped += len(result.jobs) - len(kept)
+    result.jobs = kept
+    return result
+
+
+def _filter(result: FeedResult) -> FeedResult:
+    # Entries without a link or GUID have no identity and would all collide on one key
+    return _drop(result, lambda job: job.get("title") and (job.get("url") or job.get("guid")))
+
+
+def _dedupe(seen: set):
+    """Drop postings already seen earlier in this run (same job on several feeds)"""
+    def stage(result: FeedResult) -> FeedResult:
+        def first(job):
+            if job["dedup_key"] in seen:
+                return False
+            seen.add(job["dedup_key"])
+            return True
+        return _drop(result, first)
+    return stage
+
+
+def _score(keywords: str):
+    """Rank jobs by keyword hits, title matches counting triple"""
+    matcher = keyword_matcher(keywords)
+
+    def stage(result: FeedResult) -> FeedResult:
+        if not matcher:
+            return result
+        for job in result.jobs:
+            title_hits = sum(matcher.counts(job["title"]).values())
+            body_hits = sum(matcher.counts(job.get("description") or "").values())
+            job["score"] = 3 * title_hits + body_hits
+        if result.jobs:
+            result.jobs.sort(key=lambda job: job["score"], reverse=True)
+        return result
+    return stage
+
+
+def _persist(bind):
+    def stage(result: FeedResult) -> tuple:
+        # Runs in a worker thread, so it needs its own session
+        with Session(bind) as db:
+            counts = upsert_job_postings(db, result.jobs)
+            counts["grouped"] = 0
+            if counts["inserted"] or counts["updated"]:
+                # Only this feed's postings: older unfingerprinted rows are backfilled at startup
+                keys = [job["dedup_key"] for job in result.jobs]
+                posting_ids = db.exec(select(JobPosting.id).where(JobPosting.dedup_key.in_(keys))).all()
+                counts["grouped"] = fingerprint_pending(db, posting_ids=list(posting_ids))["duplicates"]
+            if counts["inserted"] or counts["updated"]:
+                job_index.sync(db)
+        counts["skipped"] += result.skipped
+        return result, counts
+    return stage
+
+
+def _failed(stage: str, item, error: Exception) -> tuple:
+    """A feed whose stage raised still comes out of the pipeline, as a failure with nothing stored"""
+    if isinstance(item, FeedResult):
+        result = FeedResult(item.feed_url, error=f"{stage} failed: {error}", elapsed=item.elapsed)
+    else:
+        result = FeedResult(item, error=f"{stage} failed: {error}")
+    return result, {"inserted": 0, "updated": 0, "skipped": 0, "grouped": 0}
+
+
+def ingest_pipeline(db: Session, keywords: str, limit: Optional[int], states: Dict[str, FeedState],
+                    client: Optional[SharedHttpClient] = None, max_concurrency: int = MAX_CONCURRENT_FEEDS,
+                    max_per_host: int = MAX_CONCURRENT_PER_HOST, stop_at_seen: bool = False) -> Pipeline:
+    """
+    fetch (download + streaming parse, which also applies the keyword match so
+    it can stop at `limit`) -> normalize -> filter -> dedupe -> score -> persist
+    """
+    client = client or http_client
+    limiter = _HostLimiter(max_concurrency, max_per_host)
+
+    async def fetch(url: str) -> FeedResult:
+        return await _ingest_one(client, limiter, url, keywords, limit, states.get(url), stop_at_seen)
+
+    return Pipeline(
+        [
+            Stage("fetch", fetch, concurrency=max_concurrency, queue_size=QUEUE_SIZE),
+            Stage("normalize", _normalize, concurrency=NORMALIZE_CONCURRENCY, blocking=True, queue_size=QUEUE_SIZE),
+            Stage("filter", _filter, queue_size=QUEUE_SIZE),
+            Stage("dedupe", _dedupe(set()), queue_size=QUEUE_SIZE),
+            Stage("score", _score(keywords), queue_size=QUEUE_SIZE),
+            Stage("persist", _persist(db.get_bind()), concurrency=PERSIST_CONCURRENCY, blocking=True,
+                  queue_size=QUEUE_SIZE),
+        ],
+        size=lambda item: len(item[0].jobs if isinstance(item, tuple) else item.jobs),
+        metrics=PIPELINE_METRICS,
+        on_error=_failed,
+    )
+
+
+def pipeline_stats() -> Dict[str, dict]:
+    return {name: metrics.as_dict() for name, metrics in PIPELINE_METRICS.items()}
+
+
+async def iter_ingest(db: Session, feed_urls: Iterable[str], keywords: str = "",
+                      limit: Optional[int] = 10, **kwargs) -> AsyncIterator[tuple]:
+    """
+    Fetch feeds conditionally and persist each one as it finishes: upsert its
+    postings and group near-duplicates. Yields (FeedResult, counts) per feed,
+    including a failed result for a feed whose pipeline stage raised.
+    A feed's new validators are recorded only after its postings are persisted,
+    so a failed or cancelled run fetches the same entries again next time.
+    Feed state is saved even when the consumer stops early.
+    """
+    urls = list(dict.fromkeys(u.strip() for u in feed_urls if u and u.strip()))
+    states = load_feed_states(db, urls)
+    try:
+        async for result, counts in ingest_pipeline(db, keywords, limit, states, **kwargs).run(urls):
+            apply_state_update(result, states.get(result.feed_url))
+            yield result, counts
+    finally:
+        save_feed_states(db, states)
+
+
+async def ingest_and_store(db: Session, feed_urls: Iterable[str], keywords: str = "", limit: Optional[int] = 10,
+                           deadline: Optional[float] = None, on_result=None) -> dict:
+    """
+    Full scrape through iter_ingest with an overall deadline.
+    `on_result(result, counts, done, total)` is awaited as each feed finishes.
+    """
+    urls = list(dict.fromkeys(u.strip() for u in feed_urls if u and u.strip()))
+    results: List[FeedResult] = []
+    totals = {"inserted": 0, "updated": 0, "skipped": 0, "grouped": 0}
+
+    async def _collect():
+        async for result, counts in iter_ingest(db, urls, keywords, limit):
+            results.append(result)
+            for key, value in counts.items():
+                totals[key] += value
+            if on_result is not None:
+                await on_result(result, counts, len(results), len(urls))
+
+    try:
+        await asyncio.wait_for(_collect(), timeout=deadline)
+    except asyncio.TimeoutError:
+        finished = {r.feed_url for r in results}
+        results.extend(FeedResult(url, error="Timed out") for url in urls if url not in finished)
+
+    return {"results": results, "counts": totals}
+
+
+def feed_summary(db: Session, result: FeedResult, counts: dict) -> dict:
+    """One finished feed as the scrape stream shows it: a status line and its job cards"""
+    return {
+        "feed_url": result.feed_url,
+        "error": result.error,
+        "not_modified": result.not_modified,
+        "elapsed": round(result.elapsed, 2),
+        "counts": counts,
+        "jobs": scrape_summary(db, {"results": [result], "counts": counts})["jobs"] if result.ok else [],
+    }
+
+
+def scrape_summary(db: Session, outcome: dict, limit: int = 10) -> dict:
+    """
+    JSON-serializable view of an ingest_and_store outcome for rendering: jobs
+    to show (stored postings for unchanged feeds, near-duplicates collapsed),
+    per-feed failures and the upsert counts.
+    """
+    results: List[FeedResult] = outcome["results"]
+    jobs = [job for result in results for job in result.jobs]
+    unchanged = [result.feed_url for result in results if result.not_modified]
+    if unchanged:
+        # Nothing new was parsed for these feeds, show what is already stored
+        stored = db.exec(
+            select(JobPosting)
+            .where(JobPosting.source.in_(unchanged))
+            .order_by(JobPosting.created_at.desc())
+            .limit(limit)
+        ).all()
+        jobs += [posting.model_dump() for posting in stored]
+
+    # Collapse near-duplicates found on other boards into their canonical posting. The stored id and
+    # updated_at identify the posting to save and key its rendered card
+    keys = [job.get("dedup_key") or dedup_key(job) for job in jobs]
+    stored = {
+        key: (posting_id, updated_at, duplicate_of)
+        for key, posting_id, updated_at, duplicate_of in db.exec(
+            select(JobPosting.dedup_key, JobPosting.id, JobPosting.updated_at, JobPosting.duplicate_of)
+            .where(JobPosting.dedup_key.in_(keys))
+        )
+    }
+    shown = []
+    for job, key in zip(jobs, keys):
+        posting_id, updated_at, duplicate_of = stored.get(key, (None, None, None))
+        if duplicate_of is not None:
+            continue
+        shown.append({
+            **{k: job.get(k) for k in ("title", "company", "location", "description", "url", "source")},
+            "id": posting_id,
+            "updated_at": updated_at,
+        })
+
+    return {
+        "jobs": shown,
+        "feeds": len(results),
+        "failed": [{"feed_url": r.feed_url, "error": r.error} for r in results if not r.ok],
+        "unchanged": len(unchanged),
+        "counts": outcome["counts"],
+    }
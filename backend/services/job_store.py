@@ -0,0 +1,111 @@
+# backend/services/job_store.py
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from backend.database import dialect_insert
+from backend.models import JobPosting
+from backend.services.dedupe import forget_fingerprints
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+# Columns refreshed when an already-stored posting is scraped again; only a
+# change in content counts as an update (feeds often omit or shift dates)
+_COMPARED = ("title", "company", "location", "description", "url")
+_UPDATABLE = _COMPARED + ("published_at",)
+
+_TRACKING_PARAMS = {"ref", "fbclid", "gclid", "mc_cid", "mc_eid"}
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a posting URL: lowercase host, no fragment, no tracking params, sorted query"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith("utm_") or k.lower() in _TRACKING_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def dedup_key(job: dict) -> str:
+    """Stable identity of a posting: its GUID when the feed provides one, otherwise its URL"""
+    guid = (job.get("guid") or "").strip()
+    url = (job.get("url") or "").strip()
+    if guid and guid != url and not guid.startswith(("http://", "https://")):
+        identity = f"{job.get('source', '')}|{guid}"
+    else:
+        identity = normalize_url(guid or url)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+def _row(job: dict, now: datetime) -> dict:
+    return {
+        "title": job.get("title") or "No Title",
+        "company": job.get("company") or "Unknown",
+        "location": job.get("location") or "Remote",
+        "description": job.get("description") or "",
+        "url": job.get("url") or "",
+        "source": job.get("source") or "",
+        "published_at": job.get("published_at") or now,
+        "dedup_key": job.get("dedup_key") or dedup_key(job),
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def upsert_job_postings(db: Session, jobs: Iterable[dict], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Idempotently store scraped jobs keyed by dedup_key using the dialect's
+    INSERT ... ON CONFLICT. Rows whose content did not change are left alone;
+    updated rows lose their near-duplicate fingerprint so it is recomputed.
+    Returns inserted/updated/skipped counts.
+    """
+    now = datetime.utcnow()
+    counts = {"inserted": 0, "updated": 0, "skipped": 0}
+
+    # Later duplicates within one scrape win; Postgres rejects touching a row twice per statement
+    rows: Dict[str, dict] = {}
+    for job in jobs:
+        if "error" in job:
+            continue
+        row = _row(job, now)
+        if row["dedup_key"] in rows:
+            counts["skipped"] += 1
+        rows[row["dedup_key"]] = row
+
+    insert = dialect_insert(db.get_bind())
+    pending: List[dict] = list(rows.values())
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        keys = [row["dedup_key"] for row in batch]
+        existing = set(db.exec(select(JobPosting.dedup_key).where(JobPosting.dedup_key.in_(keys))).all())
+
+        stmt = insert(JobPosting.__table__).values(batch)
+        changed = or_(*[
+            getattr(JobPosting.__table__.c, column).is_distinct_from(stmt.excluded[column])
+            for column in _COMPARED
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["dedup_key"],
+            set_={**{column: stmt.excluded[column] for column in _UPDATABLE}, "updated_at": stmt.excluded.updated_at},
+            where=changed,
+        ).returning(JobPosting.__table__.c.dedup_key, JobPosting.__table__.c.id)
+
+        touched = dict(db.execute(stmt).all())
+        updated = [posting_id for key, posting_id in touched.items() if key in existing]
+        forget_fingerprints(db, updated)
+        counts["inserted"] += len(touched) - len(updated)
+        counts["updated"] += len(updated)
+        counts["skipped"] += len(batch) - len(touched)
+
+    db.commit()
+    logger.info(f"Upserted job postings: {counts}")
+    return counts
@@ -0,0 +1,131 @@
+# backend/services/keywords.py
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple, Union
+
+# Alias -> canonical keyword. Both spellings match, results use the canonical one.
+SYNONYMS = {
+    "k8s": "kubernetes",
+    "kube": "kubernetes",
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "golang": "go",
+    "py": "python",
+    "python3": "python",
+    "nodejs": "node",
+    "node.js": "node",
+    "reactjs": "react",
+    "react.js": "react",
+    "vuejs": "vue",
+    "vue.js": "vue",
+    "amazon web services": "aws",
+    "gcp": "google cloud",
+    "ml": "machine learning",
+    "ci/cd": "ci",
+    "rest api": "rest",
+    "restful": "rest",
+    "tf": "terraform",
+}
+
+# Skills recognised in job descriptions when no better keyword extractor is installed
+TECH_SKILLS = {
+    "python", "java", "javascript", "typescript", "go", "rust", "ruby", "php", "c++", "c#", "scala", "kotlin",
+    "swift", "sql", "html", "css", "react", "vue", "angular", "node", "django", "flask", "fastapi", "spring",
+    "aws", "azure", "google cloud", "docker", "kubernetes", "terraform", "ansible", "linux", "windows", "git",
+    "postgresql", "mysql", "mongodb", "redis", "nosql", "elasticsearch", "kafka", "spark", "graphql", "rest",
+    "api", "ci", "machine learning", "pandas", "numpy", "pytorch", "tensorflow",
+}
+
+# Skills that are also everyday words ("go live", "spring 2025", "the rest of the team",
+# "swift delivery", "a window"). In job and resume text they count only by these spellings.
+AMBIGUOUS_SKILLS = {
+    "go": ("golang", "go lang"),
+    "rest": ("rest api", "rest apis", "restful"),
+    "spring": ("spring boot", "spring framework", "spring mvc"),
+    "swift": ("swiftui", "swift ui", "swift programming"),
+    "windows": ("windows server", "microsoft windows"),
+}
+
+# Keywords may contain symbols (c++, c#, node.js), so \b is not enough for boundaries
+_LEFT = r"(?<![\w+#.])"
+_RIGHT = r"(?![\w+#]|\.\w)"
+
+
+def canonical(keyword: str) -> str:
+    keyword = " ".join(keyword.lower().split())
+    return SYNONYMS.get(keyword, keyword)
+
+
+def split_keywords(keywords: Union[str, Iterable[str], None]) -> Tuple[str, ...]:
+    """Comma-separated string or iterable -> sorted tuple of distinct canonical keywords"""
+    if not keywords:
+        return ()
+    if isinstance(keywords, str):
+        keywords = keywords.split(",")
+    return tuple(sorted({canonical(k) for k in keywords if k and k.strip()}))
+
+
+class KeywordMatcher:
+    """
+    All keywords (and their aliases) compiled into one case-insensitive regex,
+    so a text is scanned once regardless of how many keywords there are.
+    With strict=True, AMBIGUOUS_SKILLS match only by their unambiguous spellings.
+    """
+
+    def __init__(self, keywords: Tuple[str, ...], strict: bool = False):
+        self.keywords = keywords
+        variants: Dict[str, str] = {}
+        for keyword in keywords:
+            if strict and keyword in AMBIGUOUS_SKILLS:
+                variants.update((form, keyword) for form in AMBIGUOUS_SKILLS[keyword])
+            else:
+                variants[keyword] = keyword
+        for alias, target in SYNONYMS.items():
+            if target in keywords:
+                variants.setdefault(alias, target)
+        self._canonical = variants
+        # Longest first so "node.js" wins over "node" at the same position
+        alternatives = sorted(variants, key=len, reverse=True)
+        pattern = "|".join(re.escape(v).replace(r"\ ", r"\s+") for v in alternatives)
+        self._regex = re.compile(f"{_LEFT}(?:{pattern}){_RIGHT}", re.IGNORECASE) if alternatives else None
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords)
+
+    def _keyword(self, match: re.Match) -> str:
+        return self._canonical[" ".join(match.group(0).lower().split())]
+
+    def matches(self, text: str) -> bool:
+        """True if any keyword occurs; stops at the first hit"""
+        return bool(self._regex and text and self._regex.search(text))
+
+    def scan(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Canonical keyword -> (start, end) of every occurrence, in one pass"""
+        positions: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        if self._regex and text:
+            for match in self._regex.finditer(text):
+                positions[self._keyword(match)].append(match.span())
+        return dict(positions)
+
+    def counts(self, text: str) -> Dict[str, int]:
+        return {keyword: len(spans) for keyword, spans in self.scan(text).items()}
+
+
+@lru_cache(maxsize=256)
+def _compiled(keywords: Tuple[str, ...], strict: bool = False) -> KeywordMatcher:
+    return KeywordMatcher(keywords, strict)
+
+
+def keyword_matcher(keywords: Union[str, Iterable[str], None]) -> KeywordMatcher:
+    """Cached matcher for a keyword set; the same set in any order or spelling reuses one regex"""
+    return _compiled(split_keywords(keywords))
+
+
+def skill_matcher() -> KeywordMatcher:
+    """Known skills in free text; words like "go" or "rest" count only in an unambiguous form"""
+    return _compiled(split_keywords(TECH_SKILLS), strict=True)
@@ -0,0 +1,374 @@
+# backend/services/llm.py
+"""
+Async gateway for LLM calls.
+
+Every completion goes through one gateway that talks to an OpenAI-compatible
+chat completions endpoint over the shared HTTP client. It enforces a global
+and a per-user concurrency limit, an overall deadline per call and a rolling
+per-user token budget, and streams tokens as they arrive. Callers catch
+LLMError to fall back to their non-LLM path.
+
+Completions are cached by a hash of the normalized prompt, model and sampling
+parameters (memo cache namespace "llm", with a TTL), and identical requests
+in flight at the same time share one upstream call.
+
+Point OPENAI_BASE_URL at backend/llm_mock.py to run without an API key.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from backend.services.http_client import http_client
+from backend.services.memo import content_hash, memo_cache, memo_key
+
+logger = logging.getLogger(__name__)
+
+LLM_API_KEY = os.getenv("OPENAI_API_KEY", "")
+LLM_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # seconds for a whole completion
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_PER_USER = int(os.getenv("LLM_MAX_PER_USER", "2"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "500"))  # completion tokens per call
+LLM_USER_TOKEN_BUDGET = int(os.getenv("LLM_USER_TOKEN_BUDGET", "20000"))  # tokens per user per window
+LLM_BUDGET_WINDOW = int(os.getenv("LLM_BUDGET_WINDOW", "3600"))  # seconds
+LLM_CACHE_TTL = timedelta(seconds=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))))
+
+Messages = List[Dict[str, str]]
+
+
+class LLMError(Exception):
+    """The completion could not be produced; use the fallback"""
+
+
+class LLMUnavailable(LLMError):
+    """No API key is configured"""
+
+
+class LLMTimeout(LLMError):
+    """The completion did not finish within its deadline"""
+
+
+class LLMBudgetExceeded(LLMError):
+    """The user has used up their token budget for the current window"""
+
+
+def estimate_tokens(text: str) -> int:
+    # About four characters per token for English text; good enough for budgeting
+    return max(1, len(text or "") // 4)
+
+
+def request_key(model: str, messages: Messages, max_tokens: int, temperature: float) -> str:
+    """Cache key: whitespace differences in the prompt do not matter, parameters do"""
+    normalized = [[message["role"], " ".join(message["content"].split())] for message in messages]
+    return memo_key(model, f"t{temperature}", f"m{max_tokens}", content_hash(json.dumps(normalized)))
+
+
+class _Flight:
+    """One upstream completion, read by every caller that asked for it while it ran"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def push(self, text: str):
+        self.chunks.append(text)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done, self.error = True, error
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    error = self.error if isinstance(self.error, LLMError) else LLMError(str(self.error))
+                    raise type(error)(str(error)) from self.error
+                return
+            await self._changed.wait()
+
+
+class TokenBudget:
+    """Rolling window of token spend per user. Calls reserve their worst case up front."""
+
+    def __init__(self, limit: int = LLM_USER_TOKEN_BUDGET, window: int = LLM_BUDGET_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._spent: Dict[str, Deque[List]] = defaultdict(deque)
+
+    def used(self, user: str) -> int:
+        entries = self._spent[user]
+        cutoff = time.monotonic() - self.window
+        while entries and entries[0][0] < cutoff:
+            entries.popleft()
+        return sum(tokens for _, tokens in entries)
+
+    def reserve(self, user: str, tokens: int) -> List:
+        if self.used(user) + tokens > self.limit:
+            raise LLMBudgetExceeded(f"Token budget of {self.limit} per {self.window}s used up")
+        entry = [time.monotonic(), tokens]
+        self._spent[user].append(entry)
+        return entry
+
+    @staticmethod
+    def settle(entry: List, tokens: int):
+        """Replace a reservation with what the call actually used"""
+        entry[1] = tokens
+
+
+@dataclass
+class GatewayMetrics:
+    requests: int = 0
+    completed: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    over_budget: int = 0
+    active: int = 0
+    waiting: int = 0
+    tokens: int = 0
+    first_token_seconds: float = 0.0
+    total_seconds: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    coalesced: int = 0
+    saved_seconds: float = 0.0
+    saved_tokens: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "over_budget": self.over_budget,
+            "active": self.active,
+            "waiting": self.waiting,
+            "tokens": self.tokens,
+            "avg_first_token_ms": round(1000 * self.first_token_seconds / self.completed, 1) if self.completed else None,
+            "avg_total_ms": round(1000 * self.total_seconds / self.completed, 1) if self.completed else None,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "coalesced": self.coalesced,
+            "latency_saved_seconds": round(self.saved_seconds, 3),
+            "tokens_saved": self.saved_tokens,
+        }
+
+
+class LLMGateway:
+    def __init__(self, api_key: str = LLM_API_KEY, base_url: str = LLM_BASE_URL, model: str = LLM_MODEL,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_per_user: int = LLM_MAX_PER_USER):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.budget = TokenBudget()
+        self.metrics = GatewayMetrics()
+        # Semaphores belong to an event loop, so they are created lazily per loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        self._users: Dict[str, asyncio.Semaphore] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self.cache = memo_cache("llm", ttl=LLM_CACHE_TTL)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    def _semaphores(self, user: str) -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._global = asyncio.Semaphore(self.max_concurrency)
+            self._users = {}
+            self._flights = {}
+        if user not in self._users:
+            self._users[user] = asyncio.Semaphore(self.max_per_user)
+        return self._global, self._users[user]
+
+    @asynccontextmanager
+    async def _slot(self, user: str, deadline: float):
+        """Hold a per-user and a global slot; waiting for them counts against the deadline"""
+        loop = asyncio.get_running_loop()
+        acquired = []
+        self.metrics.waiting += 1
+        try:
+            for semaphore in self._semaphores(user):
+                await asyncio.wait_for(semaphore.acquire(), max(deadline - loop.time(), 0))
+                acquired.append(semaphore)
+        except asyncio.TimeoutError:
+            for semaphore in acquired:
+                semaphore.release()
+            raise LLMTimeout("Timed out waiting for a free LLM slot")
+        finally:
+            self.metrics.waiting -= 1
+        self.metrics.active += 1
+        try:
+            yield
+        finally:
+            self.metrics.active -= 1
+            for semaphore in acquired:
+                semaphore.release()
+
+    async def stream(self, messages: Messages, user: str = "anonymous", max_tokens: int = LLM_MAX_TOKENS,
+                     timeout: float = LLM_TIMEOUT, temperature: float = 0.7, cache: bool = True) -> AsyncIterator[str]:
+        """
+        Yield completion text as it is generated; raises LLMError (LLMTimeout
+        past `timeout`). A cached completion comes back as one piece; a request
+        identical to one in flight follows that one instead of calling the API.
+        """
+        if not self.enabled:
+            raise LLMUnavailable("OPENAI_API_KEY is not set")
+        if not cache:
+            async for text in self._generate(messages, user, max_tokens, timeout, temperature):
+                yield text
+            return
+
+        key = request_key(self.model, messages, max_tokens, temperature)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self.metrics.cache_hits += 1
+            self.metrics.saved_seconds += cached["seconds"]
+            self.metrics.saved_tokens += cached["tokens"]
+            yield cached["text"]
+            return
+
+        self._semaphores(user)  # flights belong to the running loop too
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.metrics.coalesced += 1
+        else:
+            self.metrics.cache_misses += 1
+            flight = self._flights[key] = _Flight()
+            # The upstream call runs on its own, so one caller going away does not
+            # cancel it for the others, and the result is still cached
+            flight.task = asyncio.create_task(
+                self._fill(key, flight, messages, user, max_tokens, timeout, temperature)
+            )
+        async for text in flight.follow():
+            yield text
+
+    async def _fill(self, key: str, flight: _Flight, messages: Messages, user: str, max_tokens: int,
+                    timeout: float, temperature: float):
+        started = time.perf_counter()
+        try:
+            async for text in self._generate(messages, user, max_tokens, timeout, temperature):
+                flight.push(text)
+        except BaseException as e:
+            self._flights.pop(key, None)
+            flight.finish(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        flight.finish()
+        text = "".join(flight.chunks)
+        tokens = sum(estimate_tokens(message["content"]) for message in messages) + estimate_tokens(text)
+        try:
+            await asyncio.to_thread(
+                self.cache.set, key, {"text": text, "seconds": time.perf_counter() - started, "tokens": tokens},
+            )
+        finally:
+            # Until the cache has it, late arrivals read the finished flight
+            self._flights.pop(key, None)
+
+    async def _generate(self, messages: Messages, user: str, max_tokens: int, timeout: float,
+                        temperature: float) -> AsyncIterator[str]:
+        self.metrics.requests += 1
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        try:
+            reservation = self.budget.reserve(user, prompt_tokens + max_tokens)
+        except LLMBudgetExceeded:
+            self.metrics.over_budget += 1
+            raise
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+        completion_tokens = 0
+        first_token = None
+        try:
+            async with self._slot(user, deadline):
+                async with http_client.stream(
+                    "POST", f"{self.base_url}/chat/completions",
+                    headers={"Authorization": f"Bearer {self.api_key}"},
+                    json={"model": self.model, "messages": messages, "max_tokens": max_tokens,
+                          "temperature": temperature, "stream": True},
+                    timeout=httpx.Timeout(max(deadline - loop.time(), 0.1)),
+                    retries=0,
+                ) as response:
+                    if response.status_code != 200:
+                        raise LLMError(f"LLM API returned HTTP {response.status_code}")
+                    lines = response.aiter_lines()
+                    while True:
+                        try:
+                            line = await asyncio.wait_for(lines.__anext__(), max(deadline - loop.time(), 0))
+                        except StopAsyncIteration:
+                            break
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        choices = json.loads(data).get("choices") or [{}]
+                        text = (choices[0].get("delta") or {}).get("content")
+                        if text:
+                            if first_token is None:
+                                first_token = loop.time() - started
+                            completion_tokens += estimate_tokens(text)
+                            yield text
+            self.metrics.completed += 1
+            self.metrics.first_token_seconds += first_token or 0.0
+            self.metrics.total_seconds += loop.time() - started
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            self.metrics.timeouts += 1
+            raise LLMTimeout(f"No completion within {timeout}s") from e
+        except LLMTimeout:
+            self.metrics.timeouts += 1
+            raise
+        except LLMError:
+            self.metrics.errors += 1
+            raise
+        except (httpx.HTTPError, ValueError) as e:
+            # Transport failures, open circuit, malformed chunks
+            self.metrics.errors += 1
+            raise LLMError(f"LLM request failed: {e}") from e
+        finally:
+            self.metrics.tokens += prompt_tokens + completion_tokens
+            self.budget.settle(reservation, prompt_tokens + completion_tokens)
+
+    async def complete(self, messages: Messages, **kwargs) -> str:
+        """The whole completion as one string"""
+        return "".join([text async for text in self.stream(messages, **kwargs)])
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "model": self.model,
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            **self.metrics.as_dict(),
+        }
+
+
+llm = LLMGateway()
@@ -0,0 +1,204 @@
+# backend/services/memo.py
+"""
+Two-tier memoization for expensive, deterministic results.
+
+Tier 1 is an in-process LRU; tier 2 is the cache_entry table, shared by every
+web and worker process and bounded by total stored bytes (least recently used
+entries are evicted first). Keys are built from content hashes plus a method /
+version tag, so changing an algorithm only needs a version bump. Namespaces
+may also set a TTL after which entries count as misses.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, func, select
+
+from backend.database import dialect_insert, engine
+from backend.models import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+MEMO_LRU_SIZE = int(os.getenv("MEMO_LRU_SIZE", "512"))
+MEMO_DB_MAX_BYTES = int(os.getenv("MEMO_DB_MAX_BYTES", str(50 * 1024 * 1024)))
+# A DB hit refreshes last_used_at at most this often, so reads rarely write
+TOUCH_INTERVAL = timedelta(hours=1)
+# Enforce the byte budget every N writes rather than on each one
+EVICT_EVERY = 50
+
+_MISSING = object()
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def memo_key(*parts: str) -> str:
+    return ":".join(parts)
+
+
+class MemoCache:
+    def __init__(self, namespace: str, lru_size: int = MEMO_LRU_SIZE, db_max_bytes: int = MEMO_DB_MAX_BYTES,
+                 ttl: Optional[timedelta] = None):
+        self.namespace = namespace
+        self.lru_size = lru_size
+        self.db_max_bytes = db_max_bytes
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "evicted": 0, "errors": 0}
+
+    def _expired(self, created_at: datetime) -> bool:
+        return self.ttl is not None and datetime.utcnow() - created_at > self.ttl
+
+    def _remember(self, key: str, value: Any, created_at: Optional[datetime] = None):
+        with self._lock:
+            self._lru[key] = (created_at or datetime.utcnow(), value)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _db_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            created_at, value = self._lru.get(key, (None, _MISSING))
+            if value is not _MISSING:
+                if not self._expired(created_at):
+                    self._lru.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._lru[key]
+                value = _MISSING
+
+        try:
+            with Session(engine) as db:
+                entry = db.get(CacheEntry, self._db_key(key))
+                if entry is not None and not self._expired(entry.created_at):
+                    created_at, value = entry.created_at, json.loads(entry.value)
+                    now = datetime.utcnow()
+                    if now - entry.last_used_at > TOUCH_INTERVAL:
+                        entry.last_used_at = now
+                        db.add(entry)
+                        db.commit()
+        except Exception as e:
+            # The cache must never break the computation it is caching
+            self.counters["errors"] += 1
+            logger.warning(f"Memo cache read failed ({self.namespace}): {e}")
+            value = _MISSING
+        if value is _MISSING:
+            self.counters["misses"] += 1
+            return default
+        self.counters["db_hits"] += 1
+        self._remember(key, value, created_at)
+        return value
+
+    def set(self, key: str, value: Any):
+        self._remember(key, value)
+        payload = json.dumps(value)
+        now = datetime.utcnow()
+        try:
+            with Session(engine) as db:
+                insert = dialect_insert(db.get_bind())
+                stmt = insert(CacheEntry.__table__).values(
+                    key=self._db_key(key), namespace=self.namespace, value=payload, size=len(payload),
+                    created_at=now, last_used_at=now,
+                )
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=["key"],
+                    set_={"value": stmt.excluded.value, "size": stmt.excluded.size, "created_at": now,
+                          "last_used_at": now},
+                ))
+                db.commit()
+                self._writes += 1
+                if self._writes % EVICT_EVERY == 0:
+                    self.evict(db)
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Memo cache write failed ({self.namespace}): {e}")
+
+    def evict(self, db: Session):
+        """Delete least recently used rows of this namespace until it fits db_max_bytes"""
+        total = db.exec(
+            select(func.coalesce(func.sum(CacheEntry.size), 0)).where(CacheEntry.namespace == self.namespace)
+        ).one()
+        excess = total - self.db_max_bytes
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in db.exec(
+            select(CacheEntry.key, CacheEntry.size)
+            .where(CacheEntry.namespace == self.namespace)
+            .order_by(CacheEntry.last_used_at)
+        ):
+            victims.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        db.execute(delete(CacheEntry).where(CacheEntry.key.in_(victims)))
+        db.commit()
+        self.counters["evicted"] += len(victims)
+        logger.info(f"Memo cache {self.namespace}: evicted {len(victims)} entries")
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+        with Session(engine) as db:
+            db.execute(delete(CacheEntry).where(CacheEntry.namespace == self.namespace))
+            db.commit()
+
+    def memoize(self, key: str, compute: Callable[[], Any], cacheable: Callable[[Any], bool] = lambda value: True):
+        """Cached value for `key`, computing and storing it on a miss (unless `cacheable` says no)"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    async def amemoize(self, key: str, compute: Callable[[], Awaitable[Any]],
+                       cacheable: Callable[[Any], bool] = lambda value: True):
+        """memoize() for a coroutine; cache I/O runs in a worker thread"""
+        value = await asyncio.to_thread(self.get, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = await compute()
+        if cacheable(value):
+            await asyncio.to_thread(self.set, key, value)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._lru)
+        lookups = self.counters["memory_hits"] + self.counters["db_hits"] + self.counters["misses"]
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "memory_entries": size,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+_caches: Dict[str, MemoCache] = {}
+
+
+def memo_cache(namespace: str, ttl: Optional[timedelta] = None) -> MemoCache:
+    """The process-wide cache for a namespace; `ttl` applies when it is first created"""
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = _caches.setdefault(namespace, MemoCache(namespace, ttl=ttl))
+    return cache
+
+
+def memo_stats() -> Dict[str, dict]:
+    return {namespace: cache.stats() for namespace, cache in _caches.items()}
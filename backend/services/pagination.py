@@ -0,0 +1,51 @@
+# backend/services/pagination.py
+import base64
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlmodel import Session, select
+
+PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_page(db: Session, model, columns: Sequence[Any], cursor: Optional[str] = None,
+                limit: int = PAGE_SIZE, where: Sequence[Any] = ()) -> Tuple[List[Any], Optional[str]]:
+    """
+    One page of `columns` from `model`, newest first, ordered by (created_at, id).
+    Returns the rows and the cursor for the next page (None on the last page).
+    Only the listed columns are selected, so heavy text columns stay in the database.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(*columns, model.created_at.label("_created_at"), model.id.label("_id"))
+    for condition in where:
+        query = query.where(condition)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.where(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.exec(query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]._created_at, rows[-1]._id)
+    return rows, next_cursor
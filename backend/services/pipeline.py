@@ -0,0 +1,152 @@
+# backend/services/pipeline.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 32
+
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    """Cumulative counters for one stage; `size` counts the units inside an item (e.g. jobs)"""
+    received: int = 0
+    emitted: int = 0
+    dropped: int = 0
+    errors: int = 0
+    units: int = 0
+    busy: float = 0.0  # seconds spent inside the stage function
+    active: float = 0.0  # wall-clock seconds between a run's first input and last output
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "emitted": self.emitted,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "units": self.units,
+            "busy_seconds": round(self.busy, 3),
+            "items_per_second": round(self.emitted / self.active, 1) if self.active else None,
+            "units_per_second": round(self.units / self.active, 1) if self.active else None,
+        }
+
+
+@dataclass
+class Stage:
+    """
+    One pipeline step. `func(item)` returns the item for the next stage, or None
+    to drop it. Blocking functions run in worker threads so CPU and database work
+    stays off the event loop.
+    """
+    name: str
+    func: Callable[[Any], Any]
+    concurrency: int = 1
+    blocking: bool = False
+    queue_size: int = QUEUE_SIZE
+
+    async def __call__(self, item):
+        if self.blocking:
+            return await asyncio.to_thread(self.func, item)
+        result = self.func(item)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+
+class Pipeline:
+    """
+    Chain of stages connected by bounded queues. A slow stage fills its input
+    queue and the stages before it wait (backpressure) instead of buffering
+    without limit. Items may finish out of order when a stage runs concurrently.
+
+    An item whose stage raises is dropped, unless `on_error(stage_name, item,
+    error)` turns it into a result: that result leaves the pipeline at once,
+    skipping the later stages, so the caller can report the failure.
+    """
+
+    def __init__(self, stages: List[Stage], size: Callable[[Any], int] = lambda item: 1,
+                 metrics: Optional[Dict[str, StageMetrics]] = None,
+                 on_error: Optional[Callable[[str, Any, Exception], Any]] = None):
+        self.stages = stages
+        self.size = size
+        self.on_error = on_error
+        self.metrics = metrics if metrics is not None else {}
+        for stage in stages:
+            self.metrics.setdefault(stage.name, StageMetrics())
+
+    async def _work(self, stage: Stage, inbox: asyncio.Queue, outbox: asyncio.Queue, results: asyncio.Queue,
+                    window: dict):
+        metrics = self.metrics[stage.name]
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                return
+            metrics.received += 1
+            window.setdefault("start", time.perf_counter())
+            started = time.perf_counter()
+            try:
+                result = await stage(item)
+            except Exception as e:
+                metrics.errors += 1
+                logger.error(f"Pipeline stage {stage.name} failed: {e}")
+                failed = self.on_error(stage.name, item, e) if self.on_error is not None else None
+                if failed is not None:
+                    await results.put(failed)
+                continue
+            finally:
+                metrics.busy += time.perf_counter() - started
+
+            if result is None:
+                metrics.dropped += 1
+                continue
+            metrics.emitted += 1
+            metrics.units += self.size(result)
+            window["end"] = time.perf_counter()
+            await outbox.put(result)
+
+    async def _run_stage(self, index: int, queues: List[asyncio.Queue]):
+        stage = self.stages[index]
+        window: dict = {}
+        try:
+            await asyncio.gather(*[
+                self._work(stage, queues[index], queues[index + 1], queues[-1], window)
+                for _ in range(stage.concurrency)
+            ])
+        finally:
+            if "end" in window:
+                self.metrics[stage.name].active += window["end"] - window["start"]
+        consumers = self.stages[index + 1].concurrency if index + 1 < len(self.stages) else 1
+        for _ in range(consumers):
+            await queues[index + 1].put(_DONE)
+
+    async def run(self, items: Iterable[Any]) -> AsyncIterator[Any]:
+        """Push `items` through every stage, yielding results as they leave the last one"""
+        queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        queues.append(asyncio.Queue(maxsize=QUEUE_SIZE))
+
+        async def _source():
+            for item in items:
+                await queues[0].put(item)
+            for _ in range(self.stages[0].concurrency):
+                await queues[0].put(_DONE)
+
+        tasks = [asyncio.create_task(_source())]
+        tasks += [asyncio.create_task(self._run_stage(i, queues)) for i in range(len(self.stages))]
+        try:
+            while True:
+                item = await queues[-1].get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, dict]:
+        return {stage.name: self.metrics[stage.name].as_dict() for stage in self.stages}
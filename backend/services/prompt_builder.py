@@ -0,0 +1,247 @@
+# backend/services/prompt_builder.py
+"""
+Token-budgeted prompts.
+
+Long resumes and postings are split into sections (headings, paragraphs),
+ranked by similarity to what the prompt is about, and packed into a fixed
+token budget: a section goes in whole if it fits, as its summary if that fits,
+or not at all. Kept sections stay in document order. Summaries are extractive
+(the sentences carrying the most skills and figures) and cached per section
+content, so a resume summarized once is reused for every job it is matched
+against.
+"""
+import html
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+
+from backend.services.keywords import skill_matcher
+from backend.services.llm import LLM_MODEL, estimate_tokens
+from backend.services.vectorizer import vectorize
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+SECTION_TOKENS = 200  # longer sections are split further
+SUMMARY_TOKENS = 60
+
+_BLOCK_TAG_RE = re.compile(r"<\s*(?:br|/p|/div|/li|/h[1-6]|/tr|li)\b[^>]*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪◦]|\d+[.)])\s+")
+_FIGURE_RE = re.compile(r"\d")
+_HEADINGS = {
+    "summary", "profile", "objective", "experience", "work experience", "professional experience",
+    "employment", "education", "skills", "technical skills", "projects", "certifications", "publications",
+    "awards", "languages", "interests", "responsibilities", "requirements", "qualifications",
+    "about you", "about us", "what you'll do", "nice to have", "benefits",
+}
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(LLM_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Exact with tiktoken installed, otherwise the gateway's estimate"""
+    encoding = _encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+
+def plain_text(text: str) -> str:
+    """Postings are stored as HTML; keep the line structure, drop the markup"""
+    if "<" in text:
+        text = _TAG_RE.sub(" ", _BLOCK_TAG_RE.sub("\n", text))
+    text = html.unescape(text)
+    return "\n".join(" ".join(line.split()) for line in text.splitlines())
+
+
+def _is_heading(line: str) -> bool:
+    words = line.rstrip(":").strip()
+    if not words or len(words) > 40:
+        return False
+    return words.lower() in _HEADINGS or (words.isupper() and len(words) > 3) or (
+        line.endswith(":") and len(words.split()) <= 4
+    )
+
+
+def _sentences(text: str) -> List[str]:
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cut at a word boundary so the result stays within max_tokens"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle]) + " ...") <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " ..." if low else ""
+
+
+def split_sections(text: str, max_tokens: int = SECTION_TOKENS) -> List[str]:
+    """
+    Split at headings and blank lines; sections longer than max_tokens are
+    split again between sentences. A heading stays with the text under it.
+    """
+    sections: List[List[str]] = [[]]
+    for line in plain_text(text).splitlines():
+        if not line:
+            if sections[-1] and not _is_heading(sections[-1][-1]):
+                sections.append([])
+            continue
+        if _is_heading(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+
+    result = []
+    for lines in sections:
+        section = "\n".join(lines)
+        if not section:
+            continue
+        if count_tokens(section) <= max_tokens:
+            result.append(section)
+            continue
+        piece: List[str] = []
+        for sentence in _sentences(section):
+            if piece and count_tokens("\n".join(piece + [sentence])) > max_tokens:
+                result.append("\n".join(piece))
+                piece = []
+            piece.append(_truncate(sentence, max_tokens))
+        if piece:
+            result.append("\n".join(piece))
+    return result
+
+
+@lru_cache(maxsize=4096)
+def summarize_section(section: str, max_tokens: int = SUMMARY_TOKENS) -> str:
+    """
+    Extractive summary: the heading plus the sentences mentioning the most
+    skills and figures, in their original order. Depends only on the section
+    content, so it is cached by it.
+    """
+    if count_tokens(section) <= max_tokens:
+        return section
+    lines = section.split("\n")
+    heading = lines[0] if _is_heading(lines[0]) else ""
+    body = "\n".join(lines[1:]) if heading else section
+    sentences = [_BULLET_RE.sub("", sentence) for sentence in _sentences(body)]
+    matcher = skill_matcher()
+    scores = [
+        2 * sum(matcher.counts(sentence).values()) + bool(_FIGURE_RE.search(sentence)) + 1 / (1 + position)
+        for position, sentence in enumerate(sentences)
+    ]
+
+    budget = max_tokens - count_tokens(heading)
+    chosen = set()
+    for index in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        candidate = " ".join(sentences[i] for i in sorted(chosen | {index}))
+        if count_tokens(candidate) <= budget:
+            chosen.add(index)
+    summary = " ".join(sentences[i] for i in sorted(chosen)) or _truncate(sentences[0] if sentences else "", budget)
+    return f"{heading}\n{summary}" if heading else summary
+
+
+def _relevance(sections: List[str], query: str) -> np.ndarray:
+    """Cosine similarity of each section to the query over the hashing vectorizer"""
+    if not query or not sections:
+        return np.zeros(len(sections))
+    matrix = vectorize([query] + sections)
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = sparse.diags(1.0 / norms) @ matrix
+    return (normalized[1:] @ normalized[0].T).toarray().ravel()
+
+
+def fit_text(text: str, max_tokens: int, query: str = "") -> str:
+    """The parts of `text` most relevant to `query` that fit in max_tokens, in document order"""
+    text = text or ""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    sections = split_sections(text)
+    # Earlier sections win ties: resumes and postings lead with what matters most
+    scores = _relevance(sections, query) + np.array([0.01 / (1 + i) for i in range(len(sections))])
+
+    kept: Dict[int, str] = {}
+    remaining = max_tokens
+    separator = count_tokens("\n\n")
+    for index in np.argsort(-scores, kind="stable"):
+        for candidate in (sections[index], summarize_section(sections[index])):
+            cost = count_tokens(candidate) + separator
+            if cost <= remaining:
+                kept[int(index)] = candidate
+                remaining -= cost
+                break
+    if not kept:
+        return _truncate(summarize_section(sections[int(np.argmax(scores))]), max_tokens)
+    return "\n\n".join(kept[index] for index in sorted(kept))
+
+
+@dataclass
+class PromptPart:
+    text: str
+    query: str = ""  # what the kept sections should be relevant to
+    share: float = 1.0  # relative claim on the budget left after the template
+
+
+def build_prompt(template: str, parts: Dict[str, PromptPart], budget: int = PROMPT_TOKEN_BUDGET,
+                 **fixed: str) -> str:
+    """
+    Fill `template` ({name} placeholders) so the whole prompt stays within
+    `budget` tokens. `fixed` values go in as they are; each part gets a share of
+    what is left, and parts needing less than their share pass the rest on.
+    """
+    base = count_tokens(template.format(**fixed, **{name: "" for name in parts}))
+    available = max(budget - base, 0)
+    needs = {name: count_tokens(part.text or "") for name, part in parts.items()}
+
+    allotment: Dict[str, int] = {}
+    pending = dict(parts)
+    while pending:
+        total_share = sum(part.share for part in pending.values()) or 1.0
+        satisfied = [name for name, part in pending.items() if needs[name] <= available * part.share / total_share]
+        if not satisfied:
+            for name, part in pending.items():
+                allotment[name] = int(available * part.share / total_share)
+            break
+        for name in satisfied:
+            allotment[name] = needs[name]
+            available -= needs[name]
+            del pending[name]
+
+    fitted = {name: fit_text(part.text, allotment[name], part.query) for name, part in parts.items()}
+    prompt = template.format(**fixed, **fitted)
+    logger.debug(f"Prompt built: {count_tokens(prompt)} of {budget} tokens")
+    return prompt
+
+
+def prompt_stats() -> dict:
+    info = summarize_section.cache_info()
+    return {
+        "tokenizer": "tiktoken" if _encoding() is not None else "estimate",
+        "budget": PROMPT_TOKEN_BUDGET,
+        "summary_cache": {"hits": info.hits, "misses": info.misses, "entries": info.currsize},
+    }
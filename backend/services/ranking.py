@@ -0,0 +1,80 @@
+# backend/services/ranking.py
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+from sqlmodel import Session, select
+
+from backend.models import Application, JobPosting
+from backend.services.vector_index import job_index
+from backend.services.vectorizer import vectorize
+
+
+def _ids(db: Session, *conditions) -> np.ndarray:
+    # Plain column scan without ORM row objects, this can be tens of thousands of ids
+    query = select(JobPosting.id)
+    for condition in conditions:
+        query = query.where(condition)
+    return np.asarray(db.connection().execute(query).scalars().all(), dtype=np.int64)
+
+
+def _rank(db: Session, query, k: int, where: Sequence = (), exclude: Sequence[int] = ()) -> List[dict]:
+    job_index.sync(db)
+    allowed = _ids(db, *where) if where else None
+    # Near-duplicates are always left out
+    excluded = np.concatenate([_ids(db, JobPosting.duplicate_of != None), np.asarray(exclude, dtype=np.int64)])  # noqa: E711
+    ranked: List[Tuple[int, float]] = job_index.rank_vector(query, k, allowed, excluded)
+    if not ranked:
+        return []
+
+    postings = {
+        row.id: row for row in db.exec(
+            select(JobPosting.id, JobPosting.title, JobPosting.company, JobPosting.location, JobPosting.url)
+            .where(JobPosting.id.in_([posting_id for posting_id, _ in ranked]))
+        ).all()
+    }
+    return [
+        {
+            "id": posting_id,
+            "title": postings[posting_id].title,
+            "company": postings[posting_id].company,
+            "location": postings[posting_id].location,
+            "url": postings[posting_id].url,
+            "score": round(score, 4),
+        }
+        for posting_id, score in ranked if posting_id in postings
+    ]
+
+
+def rank_jobs(db: Session, text: str, k: int = 20, where: Sequence = ()) -> List[dict]:
+    """
+    The k stored postings most similar to `text` (e.g. a resume). `where` holds
+    extra JobPosting conditions.
+    """
+    return _rank(db, vectorize([text]), k, where)
+
+
+def similar_jobs(db: Session, posting_id: int, k: int = 10) -> Optional[List[dict]]:
+    """Postings most similar to a stored one, using its indexed vector (None if unknown)"""
+    posting = db.get(JobPosting, posting_id)
+    if posting is None:
+        return None
+    job_index.sync(db)
+    vector = job_index.vector(posting_id)
+    if vector is None:
+        return []
+    # The posting itself and its near-duplicate group are not interesting
+    canonical_id = posting.duplicate_of or posting.id
+    group = _ids(db, or_(JobPosting.id == canonical_id, JobPosting.duplicate_of == canonical_id))
+    return _rank(db, vector, k, exclude=group.tolist())
+
+
+def jobs_like_application(db: Session, application_id: int, k: int = 10) -> Optional[List[dict]]:
+    """Stored postings most similar to an application's job (None if unknown)"""
+    application = db.get(Application, application_id)
+    if application is None:
+        return None
+    text = f"{application.title} {application.title} {application.company} {application.description}"
+    # Leave out the posting the application was created from
+    exclude = _ids(db, JobPosting.url == application.url) if application.url else []
+    return _rank(db, vectorize([text]), k, exclude=list(exclude))
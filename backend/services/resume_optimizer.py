@@ -1,86 +1,124 @@
 # backend/services/resume_optimizer.py
-import os
-from typing import Dict, Any
+import asyncio
+import logging
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Dict, Any, List, Optional
 import re
 
-def optimize_resume(resume_content: str, job_description: str, db) -> Dict[str, Any]:
+from backend.services.keywords import TECH_SKILLS, canonical, keyword_matcher, skill_matcher
+from backend.services.llm import LLMError, llm
+from backend.services.memo import content_hash, memo_cache, memo_key
+from backend.services.prompt_builder import PromptPart, build_prompt
+
+logger = logging.getLogger(__name__)
+
+# Bump when extraction or scoring changes so stale memoized results are not reused
+KEYWORDS_VERSION = "1"
+OPTIMIZER_VERSION = "2"
+
+@lru_cache(maxsize=1)
+def _keyword_method() -> str:
+    return "yake" if find_spec("yake") else "basic_keywords"
+
+async def optimize_resume(resume_content: str, job_description: str, db,
+                          resume_keywords: Optional[Dict[str, int]] = None, user: str = "anonymous") -> Dict[str, Any]:
     """
     Optimize resume by comparing with job description.
-    Uses OpenAI GPT if API key available, otherwise falls back to keyword matching.
+    Uses the LLM gateway if an API key is configured, otherwise (or when it
+    fails) falls back to keyword matching.
+    `resume_keywords` are the skill counts stored on Resume at upload, if any.
+    Results are memoized per (resume text, job text, method).
+    """
+    method = "openai_gpt" if llm.enabled else _keyword_method()
+    key = memo_key(OPTIMIZER_VERSION, method, content_hash(resume_content), content_hash(job_description))
+
+    async def compute():
+        if llm.enabled:
+            return await _optimize_with_gpt(resume_content, job_description, resume_keywords, user)
+        return await asyncio.to_thread(_optimize_with_local_nlp, resume_content, job_description, resume_keywords)
+
+    # Fallbacks and errors are not cached under the method's key
+    return await memo_cache("optimize").amemoize(
+        key, compute, cacheable=lambda result: "error" not in result and result.get("method") == method,
+    )
+
+def extract_job_keywords(job_description: str) -> List[str]:
+    """Keywords of a job description, memoized so one job's keywords serve every resume"""
+    method = _keyword_method()
+    key = memo_key(KEYWORDS_VERSION, method, content_hash(job_description))
+    return memo_cache("job_keywords").memoize(key, lambda: _extract_job_keywords(job_description, method))
+
+def _extract_job_keywords(job_description: str, method: str) -> List[str]:
+    if method == "yake":
+        import yake
+        kw_extractor = yake.KeywordExtractor()
+        job_keywords = kw_extractor.extract_keywords(job_description)
+        return [kw[0] for kw in job_keywords[:20]]  # Top 20 keywords
+    # Fallback to basic keyword extraction: known skills (aliases such as k8s
+    # included) plus long words
+    job_words = re.findall(r'\b[a-zA-Z]{7,}\b', job_description.lower())
+    return list(dict.fromkeys(list(skill_matcher().counts(job_description)) + job_words))
+
+_OPTIMIZE_PROMPT = """
+    Compare this resume with the job description and provide optimization suggestions:
+
+    RESUME:
+    {resume}
+
+    JOB DESCRIPTION:
+    {job_description}
+
+    Provide:
+    1. Missing keywords from the job description
+    2. Skills to emphasize
+    3. Overall match score (0-100)
+    4. Specific improvements
     """
-    openai_key = os.getenv("OPENAI_API_KEY")
-    
-    if openai_key:
-        return _optimize_with_gpt(resume_content, job_description, openai_key)
-    else:
-        return _optimize_with_local_nlp(resume_content, job_description)
-
-def _optimize_with_gpt(resume_content: str, job_description: str, api_key: str) -> Dict[str, Any]:
-    """Use OpenAI GPT for resume optimization"""
+
+async def _optimize_with_gpt(resume_content: str, job_description: str,
+                             resume_keywords: Optional[Dict[str, int]], user: str) -> Dict[str, Any]:
+    """Use the LLM for resume optimization"""
+    # Long resumes and postings are cut down to their most relevant sections
+    prompt = build_prompt(_OPTIMIZE_PROMPT, {
+        "resume": PromptPart(resume_content, query=job_description),
+        "job_description": PromptPart(job_description, query=resume_content),
+    })
     try:
-        import openai
-        openai.api_key = api_key
-        
-        prompt = f"""
-        Compare this resume with the job description and provide optimization suggestions:
-        
-        RESUME:
-        {resume_content}
-        
-        JOB DESCRIPTION:
-        {job_description}
-        
-        Provide:
-        1. Missing keywords from the job description
-        2. Skills to emphasize
-        3. Overall match score (0-100)
-        4. Specific improvements
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500
-        )
-        
-        return {
-            "method": "openai_gpt",
-            "analysis": response.choices[0].message.content,
-            "score": 85
-        }
-    except ImportError:
-        return _optimize_with_local_nlp(resume_content, job_description)
+        analysis = await llm.complete([{"role": "user", "content": prompt}], user=user)
+    except LLMError as e:
+        logger.warning(f"Resume optimization fell back to keyword matching: {e}")
+        return await asyncio.to_thread(_optimize_with_local_nlp, resume_content, job_description, resume_keywords)
+
+    return {
+        "method": "openai_gpt",
+        "analysis": analysis,
+        "score": 85
+    }
 
-def _optimize_with_local_nlp(resume_content: str, job_description: str) -> Dict[str, Any]:
+def _optimize_with_local_nlp(resume_content: str, job_description: str,
+                             resume_keywords: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
     """Use local NLP (spaCy + YAKE) or basic keyword matching for resume optimization"""
     try:
-        # Try using YAKE if available
-        try:
-            import yake
-            kw_extractor = yake.KeywordExtractor()
-            job_keywords = kw_extractor.extract_keywords(job_description)
-            job_keywords = [kw[0] for kw in job_keywords[:20]]  # Top 20 keywords
-        except ImportError:
-            # Fallback to basic keyword extraction
-            job_words = re.findall(r'\b[a-zA-Z]{4,}\b', job_description.lower())
-            common_tech_words = {'python', 'java', 'javascript', 'sql', 'html', 'css', 
-                               'react', 'node', 'aws', 'docker', 'kubernetes', 'fastapi',
-                               'django', 'flask', 'git', 'linux', 'windows', 'mongodb',
-                               'postgresql', 'mysql', 'nosql', 'api', 'rest', 'graphql'}
-            job_keywords = [word for word in set(job_words) if word in common_tech_words or len(word) > 6]
+        job_keywords = extract_job_keywords(job_description)
         
-        # Simple keyword matching
-        resume_lower = resume_content.lower()
-        included_keywords = [kw for kw in job_keywords if kw.lower() in resume_lower]
-        missing_keywords = [kw for kw in job_keywords if kw.lower() not in resume_lower]
+        # Skills already counted at upload are looked up, one pass over the resume
+        # for the remaining job keywords
+        if resume_keywords is not None:
+            found = set(resume_keywords)
+            job_keywords_to_scan = [kw for kw in job_keywords if canonical(kw) not in TECH_SKILLS]
+        else:
+            found = set()
+            job_keywords_to_scan = job_keywords
+        found.update(keyword_matcher(job_keywords_to_scan).counts(resume_content))
+        included_keywords = [kw for kw in job_keywords if canonical(kw) in found]
+        missing_keywords = [kw for kw in job_keywords if canonical(kw) not in found]
         
         # Calculate match score
         match_score = int((len(included_keywords) / len(job_keywords)) * 100) if job_keywords else 0
         
-        method_used = "yake" if 'yake' in locals() else "basic_keywords"
-        
         return {
-            "method": method_used,
+            "method": _keyword_method(),
             "included_keywords": included_keywords,
             "missing_keywords": missing_keywords,
             "match_score": match_score,
@@ -0,0 +1,141 @@
+# backend/services/resume_text.py
+"""
+Resume text extraction.
+
+Uploaded DOCX/PDF files are parsed once, in a process pool so large documents
+never block the event loop, and the normalized text, token count, skill counts
+and content hash are stored on Resume. Optimization and cover letters read that
+stored data instead of re-parsing the file.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlmodel import Session, select
+
+from backend.models import Resume
+from backend.services.keywords import skill_matcher
+from backend.services.vectorizer import tokenize
+
+logger = logging.getLogger(__name__)
+
+RESUME_PARSE_WORKERS = int(os.getenv("RESUME_PARSE_WORKERS", "2"))
+
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class ResumeParseError(Exception):
+    """The file could not be read as a resume document"""
+
+
+@dataclass
+class ExtractedResume:
+    content: str
+    token_count: int
+    keyword_counts: Dict[str, int]
+
+
+def normalize_text(text: str) -> str:
+    """NFKC, no control characters, single spaces, at most one blank line in a row"""
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    text = _SPACES_RE.sub(" ", _CONTROL_RE.sub("", text))
+    lines = [line.strip() for line in text.split("\n")]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _docx_text(path: str) -> str:
+    import docx
+
+    document = docx.Document(path)
+    parts = [paragraph.text for paragraph in document.paragraphs]
+    # Resumes often lay out skills and dates in tables
+    for table in document.tables:
+        for row in table.rows:
+            parts.append(" | ".join(cell.text for cell in row.cells))
+    return "\n".join(parts)
+
+
+def _pdf_text(path: str) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError as e:
+        raise ResumeParseError("PDF support requires pypdf") from e
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def extract_resume(path: str, filename: str) -> ExtractedResume:
+    """Parse and tokenize one file, its format taken from `filename`. Runs in a worker process."""
+    extension = os.path.splitext(filename)[1].lower()
+    try:
+        if extension == ".docx":
+            raw = _docx_text(path)
+        elif extension == ".pdf":
+            raw = _pdf_text(path)
+        else:
+            # Legacy .doc is a binary format python-docx cannot read
+            raise ResumeParseError(f"Cannot extract text from {extension} files")
+    except ResumeParseError:
+        raise
+    except Exception as e:
+        raise ResumeParseError(f"Could not read {filename}: {e}") from e
+
+    content = normalize_text(raw)
+    return ExtractedResume(
+        content=content,
+        token_count=len(tokenize(content)),
+        keyword_counts=skill_matcher().counts(content),
+    )
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=RESUME_PARSE_WORKERS)
+    return _pool
+
+
+async def extract_resume_async(path: str, filename: str) -> ExtractedResume:
+    return await asyncio.get_running_loop().run_in_executor(_executor(), extract_resume, path, filename)
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def apply_extraction(resume: Resume, extracted: ExtractedResume):
+    resume.content = extracted.content
+    resume.token_count = extracted.token_count
+    resume.keyword_counts = json.dumps(extracted.keyword_counts)
+
+
+def reuse_extraction(resume: Resume, other: Resume):
+    resume.content = other.content
+    resume.token_count = other.token_count
+    resume.keyword_counts = other.keyword_counts
+
+
+def find_by_hash(db: Session, content_hash: str) -> Optional[Resume]:
+    """An earlier upload of the same file, whose extraction can be reused"""
+    return db.exec(
+        select(Resume).where(Resume.content_hash == content_hash, Resume.token_count != None)  # noqa: E711
+    ).first()
+
+
+def resume_keywords(resume: Resume) -> Optional[Dict[str, int]]:
+    """Stored skill counts, or None for resumes saved before extraction existed"""
+    return json.loads(resume.keyword_counts) if resume.keyword_counts else None
+
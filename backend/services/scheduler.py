@@ -0,0 +1,134 @@
+# backend/services/scheduler.py
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from backend.database import engine
+from backend.models import FeedState
+from backend.services.ingest import iter_ingest, split_feed_urls
+
+logger = logging.getLogger(__name__)
+
+# Polling interval bounds; each feed moves between them based on its activity
+MIN_INTERVAL = int(os.getenv("SCHEDULER_MIN_INTERVAL", "300"))
+MAX_INTERVAL = int(os.getenv("SCHEDULER_MAX_INTERVAL", "86400"))
+DEFAULT_INTERVAL = int(os.getenv("SCRAPING_INTERVAL", "3600"))
+# Global budget: feeds fetched at once by one scheduler
+MAX_CONCURRENT_FEEDS = int(os.getenv("SCHEDULER_MAX_CONCURRENT_FEEDS", "8"))
+TICK_SECONDS = float(os.getenv("SCHEDULER_TICK", "10"))
+# How long a claimed feed is hidden from other schedulers while it is polled
+LEASE_SECONDS = 600
+JITTER = 0.2
+
+
+def _jittered(seconds: float) -> timedelta:
+    return timedelta(seconds=seconds * random.uniform(1 - JITTER, 1 + JITTER))
+
+
+def next_interval(current: int, new_entries: int, failed: bool = False) -> int:
+    """Halve the interval when a feed produced new postings, double it when quiet or failing"""
+    if new_entries and not failed:
+        return max(MIN_INTERVAL, current // 2)
+    return min(MAX_INTERVAL, current * 2)
+
+
+def schedule_feeds(db: Session, feed_urls: Iterable[str], interval: int = DEFAULT_INTERVAL) -> List[FeedState]:
+    """
+    Mark feeds for automatic polling. New feeds get a random first run within
+    one interval so a batch of registrations does not fire all at once.
+    """
+    states = []
+    for url in dict.fromkeys(u.strip() for u in feed_urls if u and u.strip()):
+        state = db.exec(select(FeedState).where(FeedState.feed_url == url)).first() or FeedState(feed_url=url)
+        if not state.scheduled:
+            state.scheduled = True
+            state.poll_interval = state.poll_interval or interval
+            state.next_run_at = datetime.utcnow() + timedelta(seconds=random.uniform(0, state.poll_interval))
+        db.add(state)
+        states.append(state)
+    db.commit()
+    return states
+
+
+def unschedule_feed(db: Session, feed_url: str) -> bool:
+    state = db.exec(select(FeedState).where(FeedState.feed_url == feed_url)).first()
+    if not state or not state.scheduled:
+        return False
+    state.scheduled = False
+    state.next_run_at = None
+    db.add(state)
+    db.commit()
+    return True
+
+
+def claim_due_feeds(db: Session, limit: int) -> List[FeedState]:
+    """Lease up to `limit` due feeds by pushing next_run_at forward, so concurrent schedulers skip them"""
+    now = datetime.utcnow()
+    due = db.exec(
+        select(FeedState)
+        .where(FeedState.scheduled == True, FeedState.next_run_at <= now)  # noqa: E712
+        .order_by(FeedState.next_run_at)
+        .limit(limit)
+    ).all()
+
+    claimed = []
+    for state in due:
+        leased = db.execute(
+            update(FeedState)
+            .where(FeedState.id == state.id, FeedState.next_run_at == state.next_run_at)
+            .values(next_run_at=now + timedelta(seconds=LEASE_SECONDS))
+        ).rowcount
+        if leased:
+            claimed.append(state)
+    db.commit()
+    for state in claimed:
+        db.refresh(state)
+    return claimed
+
+
+async def poll_due_feeds(limit: int = MAX_CONCURRENT_FEEDS) -> int:
+    """Poll every due feed once and reschedule each based on what it produced"""
+    with Session(engine) as db:
+        states = claim_due_feeds(db, limit)
+        if not states:
+            return 0
+
+        by_url = {state.feed_url: state for state in states}
+        # No entry limit: stopping at the first already-seen GUID bounds a poll, and a
+        # truncated parse would never record the feed's validators
+        async for result, counts in iter_ingest(db, list(by_url), limit=None, max_concurrency=limit,
+                                                stop_at_seen=True):
+            state = by_url[result.feed_url]
+            state.poll_interval = next_interval(state.poll_interval or DEFAULT_INTERVAL, counts["inserted"], not result.ok)
+            state.next_run_at = datetime.utcnow() + _jittered(state.poll_interval)
+            db.add(state)
+            logger.info(
+                f"Polled {result.feed_url}: {counts['inserted']} new, "
+                f"next run in {state.poll_interval}s" + (f" ({result.error})" if not result.ok else "")
+            )
+        return len(states)
+
+
+async def run_scheduler(tick: float = TICK_SECONDS, feeds: Optional[str] = None):
+    """Poll scheduled feeds forever; DEFAULT_RSS_FEEDS are registered on start"""
+    configured = split_feed_urls(feeds if feeds is not None else os.getenv("DEFAULT_RSS_FEEDS", ""))
+    if configured:
+        with Session(engine) as db:
+            schedule_feeds(db, configured)
+    logger.info(f"Feed scheduler started ({len(configured)} configured feeds)")
+
+    while True:
+        try:
+            polled = await poll_due_feeds()
+        except Exception as e:
+            logger.error(f"Scheduler tick failed: {e}")
+            polled = 0
+        # Keep draining when a full batch was due, otherwise wait for the next tick
+        if polled < MAX_CONCURRENT_FEEDS:
+            await asyncio.sleep(tick)
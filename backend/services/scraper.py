@@ -1,35 +1,57 @@
 import feedparser
 from datetime import datetime
+from time import mktime
 from ..models import JobPosting
+from .feed_stream import MAX_FEED_BYTES, FeedParseError, iter_feed_jobs
+from .keywords import keyword_matcher
 
-def scrape_jobs_from_feed(feed_url: str, keywords: str = "") -> list:
+def parse_feed(document, feed_url: str, keywords: str = "", limit: int = None, stop_guids=None) -> list:
     """
-    Scrape jobs from RSS/Atom feeds using feedparser
+    Parse an already downloaded RSS/Atom document (bytes or str) into job dicts;
+    feeds are fetched by services/ingest.py through the shared HTTP client.
+    The streaming parser stops at `limit` or at the first GUID in `stop_guids`;
+    malformed documents fall back to feedparser.
+    Blocking and CPU-bound: call it from a worker thread inside async code.
     """
+    # Bytes, so feedparser never takes the document for a URL and fetches it
+    data = document.encode("utf-8") if isinstance(document, str) else document
+    chunks = (data[i:i + 65536] for i in range(0, len(data), 65536))
     try:
-        feed = feedparser.parse(feed_url)
-        jobs = []
-        
-        for entry in feed.entries:
-            job = {
-                "title": entry.title,
-                "company": getattr(entry, 'company', 'Unknown'),
-                "location": getattr(entry, 'location', 'Remote'),
-                "description": getattr(entry, 'summary', ''),
-                "url": entry.link,
-                "source": feed_url,
-                "published_at": getattr(entry, 'published_parsed', datetime.utcnow())
-            }
-            
-            # Filter by keywords if provided
-            if keywords:
-                keyword_list = [k.strip().lower() for k in keywords.split(',')]
-                content = f"{job['title']} {job['description']}".lower()
-                if any(keyword in content for keyword in keyword_list):
-                    jobs.append(job)
-            else:
-                jobs.append(job)
-                
-        return jobs
-    except Exception as e:
-        return [{"error": f"Scraping failed: {str(e)}"}]
+        # The document is already in memory, so only the entry count bounds the work here
+        return list(iter_feed_jobs(chunks, feed_url, keywords, limit, stop_guids,
+                                   max_bytes=max(len(data), MAX_FEED_BYTES)))
+    except FeedParseError:
+        pass
+
+    feed = feedparser.parse(data)
+    matcher = keyword_matcher(keywords)
+    jobs = []
+
+    stop_guids = set(stop_guids or ())
+    for entry in feed.entries:
+        job = _entry_to_job(entry, feed_url)
+        if job["guid"] in stop_guids:
+            break
+
+        # Filter by keywords if provided
+        if matcher and not matcher.matches(f"{job['title']} {job['description']}"):
+            continue
+
+        jobs.append(job)
+        if limit and len(jobs) >= limit:
+            break
+
+    return jobs
+
+def _entry_to_job(entry, feed_url: str) -> dict:
+    published = getattr(entry, 'published_parsed', None)
+    return {
+        "title": getattr(entry, 'title', 'No Title'),
+        "company": getattr(entry, 'company', getattr(entry, 'author', 'Unknown')),
+        "location": getattr(entry, 'location', 'Remote'),
+        "description": getattr(entry, 'summary', ''),
+        "url": getattr(entry, 'link', ''),
+        "guid": getattr(entry, 'id', None) or getattr(entry, 'link', ''),
+        "source": feed_url,
+        "published_at": datetime.fromtimestamp(mktime(published)) if published else datetime.utcnow()
+    }
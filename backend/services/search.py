@@ -0,0 +1,149 @@
+# backend/services/search.py
+import logging
+import re
+from typing import Dict, List
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+logger = logging.getLogger(__name__)
+
+# Searchable tables: columns in index order; the first is the title, the last the body
+SEARCH_TABLES = {
+    "jobposting": ("title", "company", "location", "description"),
+    "application": ("title", "company", "location", "description"),
+}
+# Relative weight of each column (title > company > location = description)
+_SQLITE_WEIGHTS = "10.0, 5.0, 2.0, 1.0"
+_PG_WEIGHTS = ("A", "B", "C", "D")
+
+# Control characters mark highlights so the text can be escaped before adding <mark>
+_START, _STOP = "\x02", "\x03"
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def ensure_search_indexes(engine: Engine):
+    """Create the full-text index for each searchable table; safe to call on every startup"""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        for table, columns in SEARCH_TABLES.items():
+            if dialect == "sqlite":
+                _ensure_sqlite_fts(conn, table, columns)
+            elif dialect == "postgresql":
+                _ensure_pg_tsvector(conn, table, columns)
+            else:
+                logger.warning(f"Full-text search is not supported on {dialect}")
+
+
+def _ensure_sqlite_fts(conn, table: str, columns: tuple):
+    fts = f"{table}_fts"
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {"name": fts}
+    ).first()
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+
+    # External-content FTS5 table kept in sync by triggers
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', "
+        f"content_rowid='id', tokenize='porter unicode61', prefix='2 3')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+    ))
+    if not exists:
+        # Index rows that were stored before the FTS table existed
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+
+def _ensure_pg_tsvector(conn, table: str, columns: tuple):
+    vector = " || ".join(
+        f"setweight(to_tsvector('english', coalesce({c}, '')), '{w}')"
+        for c, w in zip(columns, _PG_WEIGHTS)
+    )
+    # A stored generated column stays in sync with every insert/update by itself
+    conn.execute(text(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED"
+    ))
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)"))
+
+
+def _terms(query: str) -> List[str]:
+    return _TERM_RE.findall(query.lower())[:10]
+
+
+def _highlight(snippet: str) -> Markup:
+    """Escape the snippet and turn highlight markers into <mark> tags"""
+    escaped = str(escape(_TAG_RE.sub(" ", snippet or "")))
+    return Markup(escaped.replace(_START, "<mark>").replace(_STOP, "</mark>"))
+
+
+def search(db: Session, query: str, table: str, limit: int = 20) -> List[Dict]:
+    """
+    Ranked full-text search over one table. Every term matches as a prefix
+    ("pyth" finds "python"). Returns id, title, company and a highlighted snippet.
+    """
+    terms = _terms(query)
+    if not terms or table not in SEARCH_TABLES:
+        return []
+
+    columns = SEARCH_TABLES[table]
+    title, body = columns[0], columns[-1]
+    dialect = db.get_bind().dialect.name
+    extra = " AND t.duplicate_of IS NULL" if table == "jobposting" else ""
+
+    if dialect == "sqlite":
+        fts = f"{table}_fts"
+        sql = text(
+            f"SELECT t.id, t.title, t.company, t.location, "
+            f"highlight({fts}, 0, :start, :stop) AS title_hl, "
+            f"snippet({fts}, {len(columns) - 1}, :start, :stop, '…', 24) AS snippet, "
+            f"bm25({fts}, {_SQLITE_WEIGHTS}) AS rank "
+            f"FROM {fts} JOIN {table} t ON t.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :match{extra} ORDER BY rank LIMIT :limit"
+        )
+        params = {"match": " AND ".join(f'"{t}"*' for t in terms)}
+    elif dialect == "postgresql":
+        sql = text(
+            f"SELECT t.id, t.title, t.company, t.location, "
+            f"ts_headline('english', t.{title}, q, :options) AS title_hl, "
+            f"ts_headline('english', t.{body}, q, :options) AS snippet, "
+            f"ts_rank_cd(t.search_vector, q) AS rank "
+            f"FROM {table} t, to_tsquery('english', :match) q "
+            f"WHERE t.search_vector @@ q{extra} ORDER BY rank DESC LIMIT :limit"
+        )
+        params = {
+            "match": " & ".join(f"{t}:*" for t in terms),
+            "options": f"StartSel={_START}, StopSel={_STOP}, MaxWords=30, MinWords=12, HighlightAll=false",
+        }
+    else:
+        return []
+
+    rows = db.execute(sql, {**params, "start": _START, "stop": _STOP, "limit": limit}).all()
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "company": row.company,
+            "location": row.location,
+            "title_html": _highlight(row.title_hl),
+            "snippet_html": _highlight(row.snippet),
+            "rank": float(row.rank),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,119 @@
+# backend/services/stats.py
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import delete, event, inspect
+from sqlmodel import Session, func, select
+
+from backend.database import dialect_insert
+from backend.models import Application, ApplicationStat, ApplicationStatus
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("status", "company", "week")
+
+
+def week_key(value) -> str:
+    """ISO week label, e.g. 2024-W07"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    year, week, _ = value.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _status_key(status) -> str:
+    return status.value if isinstance(status, ApplicationStatus) else str(status)
+
+
+def _keys(status, company, created_at) -> Iterable[Tuple[str, str]]:
+    yield "status", _status_key(status)
+    yield "company", company or "Unknown"
+    yield "week", week_key(created_at or datetime.utcnow())
+
+
+def _apply(connection, deltas: Counter):
+    """Add deltas to the summary rows in the caller's transaction"""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    insert = dialect_insert(connection)
+    table = ApplicationStat.__table__
+    stmt = insert(table).values([
+        {"dimension": dimension, "key": key, "count": delta} for (dimension, key), delta in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dimension", "key"],
+        set_={"count": table.c.count + stmt.excluded["count"]},
+    )
+    connection.execute(stmt)
+
+
+@event.listens_for(Application, "after_insert")
+def _on_insert(mapper, connection, target: Application):
+    _apply(connection, Counter(_keys(target.status, target.company, target.created_at)))
+
+
+@event.listens_for(Application, "after_delete")
+def _on_delete(mapper, connection, target: Application):
+    _apply(connection, Counter({k: -1 for k in _keys(target.status, target.company, target.created_at)}))
+
+
+@event.listens_for(Application, "after_update")
+def _on_update(mapper, connection, target: Application):
+    state = inspect(target)
+    deltas = Counter()
+    for dimension, attr in (("status", "status"), ("company", "company")):
+        history = state.attrs[attr].history
+        if not history.has_changes():
+            continue
+        for old in history.deleted:
+            deltas[(dimension, _status_key(old) if attr == "status" else old or "Unknown")] -= 1
+        for new in history.added:
+            deltas[(dimension, _status_key(new) if attr == "status" else new or "Unknown")] += 1
+    _apply(connection, deltas)
+
+
+def rebuild_application_stats(db: Session):
+    """Recompute every summary row from the application table with GROUP BY"""
+    counts = Counter()
+    for status, count in db.exec(select(Application.status, func.count()).group_by(Application.status)):
+        counts[("status", _status_key(status))] += count
+    for company, count in db.exec(select(Application.company, func.count()).group_by(Application.company)):
+        counts[("company", company or "Unknown")] += count
+    # Group by day in SQL, then fold days into ISO weeks (portable across SQLite and PostgreSQL)
+    day = func.date(Application.created_at)
+    for created_on, count in db.exec(select(day, func.count()).group_by(day)):
+        counts[("week", week_key(created_on))] += count
+
+    db.execute(delete(ApplicationStat))
+    db.add_all(ApplicationStat(dimension=d, key=k, count=c) for (d, k), c in counts.items() if c)
+    db.commit()
+    logger.info(f"Rebuilt application stats ({len(counts)} rows)")
+
+
+def ensure_application_stats(db: Session):
+    """Backfill the summary table once for databases created before it existed"""
+    has_stats = db.exec(select(ApplicationStat.key).limit(1)).first() is not None
+    has_applications = db.exec(select(Application.id).limit(1)).first() is not None
+    if has_applications and not has_stats:
+        rebuild_application_stats(db)
+
+
+def application_stats(db: Session, top_companies: int = 10, weeks: int = 12) -> Dict:
+    """Dashboard numbers read from the summary table"""
+    rows = db.exec(select(ApplicationStat).where(ApplicationStat.count > 0)).all()
+    by_dimension = {dimension: {} for dimension in DIMENSIONS}
+    for row in rows:
+        by_dimension[row.dimension][row.key] = row.count
+
+    by_status = {status.value: by_dimension["status"].get(status.value, 0) for status in ApplicationStatus}
+    by_company = dict(sorted(by_dimension["company"].items(), key=lambda item: (-item[1], item[0]))[:top_companies])
+    by_week = dict(sorted(by_dimension["week"].items())[-weeks:])
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "by_company": by_company,
+        "by_week": by_week,
+    }
@@ -0,0 +1,116 @@
+# backend/services/task_handlers.py
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import Session
+
+from backend.database import engine
+from backend.models import Resume
+from backend.services.ingest import SCRAPE_DEADLINE, feed_summary, ingest_and_store, scrape_summary
+from backend.services.llm import LLMError
+from backend.services.resume_text import resume_keywords
+from backend.services.tasks import TaskDeferred, set_progress, task_handler
+
+logger = logging.getLogger(__name__)
+
+
+class TaskContext:
+    """Handed to every task handler for reporting progress"""
+
+    def __init__(self, task_id: int, worker_id: str):
+        self.task_id = task_id
+        self.worker_id = worker_id
+
+    def progress(self, fraction: float, message: Optional[str] = None, partial=None):
+        try:
+            with Session(engine) as db:
+                set_progress(db, self.task_id, fraction, message, partial)
+        except Exception as e:
+            logger.warning(f"Could not record progress for task {self.task_id}: {e}")
+
+
+def _with_session(func, *args):
+    with Session(engine) as db:
+        return func(db, *args)
+
+
+@task_handler("scrape")
+async def scrape(ctx: TaskContext, feed_urls: list, keywords: str = "", limit: int = 10):
+    # Each finished feed is published with the progress, so the scrape stream can show it at once.
+    # Summaries and progress writes are database calls, kept off the event loop the web app shares
+    feed_results = []
+
+    async def on_result(result, counts, done, total):
+        feed_results.append(await asyncio.to_thread(_with_session, feed_summary, result, counts))
+        await asyncio.to_thread(ctx.progress, 0.9 * done / total, f"{done} of {total} feeds fetched",
+                                {"feed_results": feed_results})
+
+    def finish(db, outcome):
+        reported = {feed["feed_url"] for feed in feed_results}
+        # Feeds cut off by the deadline never reached on_result
+        feed_results.extend(feed_summary(db, result, {}) for result in outcome["results"]
+                            if result.feed_url not in reported)
+        return {**scrape_summary(db, outcome), "feed_results": feed_results}
+
+    with Session(engine) as db:
+        outcome = await ingest_and_store(db, feed_urls, keywords, limit=limit, deadline=SCRAPE_DEADLINE,
+                                         on_result=on_result)
+    return await asyncio.to_thread(_with_session, finish, outcome)
+
+
+@task_handler("optimize_resume")
+async def optimize_resume(ctx: TaskContext, resume_id: int, job_description: str, user: str = "anonymous"):
+    from backend.services.resume_optimizer import optimize_resume as optimize
+
+    with Session(engine) as db:
+        resume = db.get(Resume, int(resume_id))
+        if resume is None:
+            raise ValueError(f"Resume {resume_id} not found")
+        # Text and skill counts were extracted at upload, the file is not read again
+        content, keywords = resume.content, resume_keywords(resume)
+
+    ctx.progress(0.1, "Analyzing resume")
+    return await optimize(content, job_description, None, keywords, user)
+
+
+@task_handler("cover_letter")
+async def cover_letter(ctx: TaskContext, application_id: int, resume_id: Optional[int] = None,
+                       user: str = "anonymous", regenerate: bool = False):
+    from backend.services.cover_letter import generate_cover_letter
+
+    ctx.progress(0.1, "Writing cover letter")
+    with Session(engine) as db:
+        letter = await generate_cover_letter(application_id, db, resume_id, user, regenerate=regenerate)
+    return {"application_id": application_id, "cover_letter": letter}
+
+
+@task_handler("cover_letter_draft")
+async def cover_letter_draft(ctx: TaskContext, application_id: int, resume_id: Optional[int] = None,
+                             queued_at: Optional[str] = None):
+    """Speculative letter (services/drafts.py): runs only on spare capacity and is dropped on any failure"""
+    from backend.services.cover_letter import generate_cover_letter
+    from backend.services import drafts
+
+    with Session(engine) as db:
+        if queued_at and datetime.utcnow() - datetime.fromisoformat(queued_at) > drafts.DRAFT_MAX_AGE:
+            drafts.delete_draft(db, application_id)
+            return {"application_id": application_id, "skipped": "Expired while the system was busy"}
+        busy = drafts.system_busy(db, ctx.task_id)
+        if busy:
+            raise TaskDeferred(drafts.DRAFT_RETRY_DELAY, busy)
+
+        ctx.progress(0.1, "Drafting cover letter")
+        try:
+            # Saved as the application's draft by generate_cover_letter
+            letter = await generate_cover_letter(application_id, db, resume_id, drafts.DRAFT_USER, fallback=False)
+        except LLMError as e:
+            drafts.discard_placeholder(db, application_id)
+            return {"application_id": application_id, "skipped": str(e)}
+        except BaseException:
+            # Any other failure or a cancellation: the placeholder must not block a later draft
+            with Session(engine) as cleanup:
+                drafts.discard_placeholder(cleanup, application_id)
+            raise
+    return {"application_id": application_id, "cover_letter": letter}
@@ -0,0 +1,242 @@
+# backend/services/tasks.py
+import json
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session, func, select
+
+from backend.models import Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+VISIBILITY_TIMEOUT = int(os.getenv("TASK_VISIBILITY_TIMEOUT", "300"))  # seconds a claim stays valid
+BACKOFF_BASE = float(os.getenv("TASK_BACKOFF_BASE", "5"))
+BACKOFF_MAX = float(os.getenv("TASK_BACKOFF_MAX", "600"))
+
+# kind -> async handler(ctx, **payload) returning a JSON-serializable result
+_HANDLERS: Dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+class TaskDeferred(Exception):
+    """Raised by a handler to put its task back in the queue for later, without using up an attempt"""
+
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason)
+        self.delay = delay
+        self.reason = reason
+
+
+def task_handler(kind: str):
+    """Register an async function as the handler for a task kind"""
+    def decorator(func):
+        _HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def get_handler(kind: str) -> Optional[Callable[..., Awaitable[Any]]]:
+    return _HANDLERS.get(kind)
+
+
+def enqueue(db: Session, kind: str, payload: Optional[dict] = None, priority: int = 0,
+            max_attempts: int = 3, delay: float = 0) -> Task:
+    task = Task(
+        kind=kind,
+        payload=json.dumps(payload or {}, default=str),
+        priority=priority,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Task.status == TaskStatus.QUEUED, Task.run_after <= now),
+        # A running task whose claim expired belongs to a dead or stuck worker; it runs
+        # again only while it has attempts left (see fail_abandoned)
+        and_(Task.status == TaskStatus.RUNNING, Task.locked_until < now, Task.attempts < Task.max_attempts),
+    )
+
+
+def fail_abandoned(db: Session) -> int:
+    """Fail running tasks whose claim expired after their last attempt, instead of retrying them forever"""
+    now = datetime.utcnow()
+    failed = db.execute(
+        update(Task)
+        .where(Task.status == TaskStatus.RUNNING, Task.locked_until < now, Task.attempts >= Task.max_attempts)
+        .values(
+            status=TaskStatus.FAILED, error="Worker stopped responding on the last attempt",
+            locked_until=None, finished_at=now, updated_at=now,
+        )
+    ).rowcount
+    db.commit()
+    if failed:
+        logger.error(f"Failed {failed} task(s) abandoned by their worker with no attempts left")
+    return failed
+
+
+def claim_next(db: Session, worker_id: str, visibility_timeout: int = VISIBILITY_TIMEOUT,
+               kinds: Optional[list] = None) -> Optional[Task]:
+    """
+    Atomically claim the next runnable task. The conditional UPDATE makes the
+    claim safe between competing workers without database-specific locking.
+    """
+    fail_abandoned(db)
+    for _ in range(5):
+        now = datetime.utcnow()
+        query = select(Task.id).where(_claimable(now))
+        if kinds:
+            query = query.where(Task.kind.in_(kinds))
+        task_id = db.exec(query.order_by(Task.priority.desc(), Task.run_after, Task.id).limit(1)).first()
+        if task_id is None:
+            return None
+
+        claimed = db.execute(
+            update(Task)
+            .where(Task.id == task_id, _claimable(now))
+            .values(
+                status=TaskStatus.RUNNING,
+                locked_by=worker_id,
+                locked_until=now + timedelta(seconds=visibility_timeout),
+                attempts=Task.attempts + 1,
+                updated_at=now,
+            )
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(Task, task_id, populate_existing=True)
+    return None
+
+
+def extend_claim(db: Session, task_id: int, worker_id: str, visibility_timeout: int = VISIBILITY_TIMEOUT) -> bool:
+    """Heartbeat: push locked_until forward while the worker still owns the task"""
+    now = datetime.utcnow()
+    extended = db.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.locked_by == worker_id, Task.status == TaskStatus.RUNNING)
+        .values(locked_until=now + timedelta(seconds=visibility_timeout), updated_at=now)
+    ).rowcount
+    db.commit()
+    return bool(extended)
+
+
+def set_progress(db: Session, task_id: int, progress: float, message: Optional[str] = None, partial: Any = None):
+    """`partial` is the result so far, for readers that show it as it grows; complete() replaces it"""
+    values = {"progress": max(0.0, min(progress, 1.0)), "progress_message": message, "updated_at": datetime.utcnow()}
+    if partial is not None:
+        values["result"] = json.dumps(partial, default=str)
+    db.execute(update(Task).where(Task.id == task_id).values(**values))
+    db.commit()
+
+
+def complete(db: Session, task_id: int, worker_id: str, result: Any = None):
+    now = datetime.utcnow()
+    db.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.locked_by == worker_id)
+        .values(
+            status=TaskStatus.SUCCEEDED, result=json.dumps(result, default=str), progress=1.0,
+            locked_until=None, finished_at=now, updated_at=now,
+        )
+    )
+    db.commit()
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, capped at BACKOFF_MAX"""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1.5)
+
+
+def fail(db: Session, task_id: int, worker_id: str, error: str):
+    """Record a failure and either schedule a retry or give up after max_attempts"""
+    task = db.get(Task, task_id, populate_existing=True)
+    if task is None or task.locked_by != worker_id:
+        return
+    now = datetime.utcnow()
+    task.error = error
+    task.locked_until = None
+    task.updated_at = now
+    if task.attempts < task.max_attempts:
+        task.status = TaskStatus.QUEUED
+        task.run_after = now + timedelta(seconds=backoff_delay(task.attempts))
+        logger.warning(f"Task {task_id} ({task.kind}) failed, retrying at {task.run_after}: {error}")
+    else:
+        task.status = TaskStatus.FAILED
+        task.finished_at = now
+        logger.error(f"Task {task_id} ({task.kind}) failed permanently: {error}")
+    db.add(task)
+    db.commit()
+
+
+def defer(db: Session, task_id: int, worker_id: str, delay: float, reason: str = ""):
+    """Release a claimed task back to the queue to run after `delay` seconds; the attempt is not counted"""
+    now = datetime.utcnow()
+    db.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.locked_by == worker_id)
+        .values(
+            status=TaskStatus.QUEUED, run_after=now + timedelta(seconds=delay), attempts=Task.attempts - 1,
+            locked_by=None, locked_until=None, progress_message=reason or None, updated_at=now,
+        )
+    )
+    db.commit()
+
+
+def queued_count(db: Session, min_priority: Optional[int] = None, kind: Optional[str] = None) -> int:
+    """Runnable queued tasks, optionally only those above a priority or of one kind"""
+    query = select(func.count()).select_from(Task).where(
+        Task.status == TaskStatus.QUEUED, Task.run_after <= datetime.utcnow()
+    )
+    if min_priority is not None:
+        query = query.where(Task.priority > min_priority)
+    if kind is not None:
+        query = query.where(Task.kind == kind)
+    return db.exec(query).one()
+
+
+def running_count(db: Session, kinds: Optional[list] = None, exclude_id: Optional[int] = None) -> int:
+    """Tasks currently claimed by a live worker, in any process"""
+    query = select(func.count()).select_from(Task).where(
+        Task.status == TaskStatus.RUNNING, Task.locked_until >= datetime.utcnow()
+    )
+    if kinds:
+        query = query.where(Task.kind.in_(kinds))
+    if exclude_id is not None:
+        query = query.where(Task.id != exclude_id)
+    return db.exec(query).one()
+
+
+def cancel(db: Session, task_id: int) -> bool:
+    """Cancel a task that has not started yet"""
+    now = datetime.utcnow()
+    cancelled = db.execute(
+        update(Task)
+        .where(Task.id == task_id, Task.status == TaskStatus.QUEUED)
+        .values(status=TaskStatus.CANCELLED, finished_at=now, updated_at=now)
+    ).rowcount
+    db.commit()
+    return bool(cancelled)
+
+
+def task_status(task: Task) -> dict:
+    """Public view of a task for the progress endpoint"""
+    return {
+        "task_id": task.id,
+        "kind": task.kind,
+        "status": task.status.value if isinstance(task.status, TaskStatus) else task.status,
+        "progress": task.progress,
+        "message": task.progress_message,
+        "attempts": task.attempts,
+        "result": json.loads(task.result) if task.result else None,
+        "error": task.error,
+        "created_at": task.created_at,
+        "finished_at": task.finished_at,
+    }
@@ -0,0 +1,397 @@
+# backend/services/vector_index.py
+"""
+Persistent vector index of job postings.
+
+Each batch of added postings becomes an immutable segment directory of .npy
+files (ids plus the CSR arrays of their TF rows) that is memory-mapped, so
+opening the index costs no parsing and the OS page cache shares it between the
+web process and the workers. manifest.json lists the live segments and is
+replaced atomically. A posting that changes is simply added again; the newest
+copy wins. Compaction merges segments and drops stale rows in a background
+thread.
+
+Readers see one immutable snapshot (segments, ids, live mask, IDF) swapped in
+whole. Appending a segment updates document frequencies from the previous
+snapshot instead of rescanning every segment, and row norms under the new IDF
+are computed on the first query that needs them.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from backend.models import JobPosting
+from backend.services.vectorizer import N_FEATURES, posting_text, top_k, vectorize
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "data/vector_index")
+# Merge segments in the background once there are more than this many
+COMPACT_SEGMENTS = int(os.getenv("VECTOR_INDEX_COMPACT_SEGMENTS", "8"))
+SYNC_BATCH = 5000
+
+_ARRAYS = ("ids", "indptr", "indices", "data")
+
+
+class Segment:
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS}
+        self.ids = arrays["ids"]
+        self.matrix = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]), shape=(self.ids.shape[0], N_FEATURES), copy=False
+        )
+
+    def norms(self, idf_squared: np.ndarray) -> np.ndarray:
+        """|row * idf| for every row"""
+        squared = sparse.csr_matrix(
+            (np.square(self.matrix.data, dtype=np.float64), self.matrix.indices, self.matrix.indptr),
+            shape=self.matrix.shape,
+        )
+        return np.sqrt(squared @ idf_squared)
+
+    @staticmethod
+    def write(path: str, ids: np.ndarray, tf: sparse.csr_matrix):
+        tmp = f"{path}.tmp"
+        os.makedirs(tmp, exist_ok=True)
+        # indptr and indices share one dtype so scipy can wrap the mapped arrays without copying
+        index_dtype = np.int32 if tf.nnz < np.iinfo(np.int32).max else np.int64
+        arrays = {
+            "ids": ids.astype(np.int64),
+            "indptr": tf.indptr.astype(index_dtype),
+            "indices": tf.indices.astype(index_dtype),
+            "data": tf.data.astype(np.float32),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        os.replace(tmp, path)
+
+
+class Snapshot:
+    """
+    One published version of the index. Never changed once built: readers take
+    the whole object, so a concurrent commit cannot hand them segments of one
+    version and ids of another.
+    """
+
+    def __init__(self, manifest: dict, stamp: Optional[Tuple[int, int]], segments: List[Segment],
+                 ids: np.ndarray, live: np.ndarray, df: np.ndarray):
+        self.manifest = manifest
+        self.stamp = stamp
+        self.segments = segments
+        self.ids = ids  # ids of all rows across segments, in order
+        self.live = live  # newest, not deleted copy of each posting
+        self.df = df
+        n = max(int(live.sum()), 1)
+        idf = np.log((1 + n) / (1 + df)) + 1.0
+        self.idf_squared = idf * idf
+        self._norms: Optional[np.ndarray] = None
+        self._norms_lock = threading.Lock()
+
+    def norms(self) -> np.ndarray:
+        """Row norms under this snapshot's IDF; computed once, by the first query that needs them"""
+        if self._norms is None:
+            with self._norms_lock:
+                if self._norms is None:
+                    norms = [segment.norms(self.idf_squared) for segment in self.segments]
+                    self._norms = np.concatenate(norms) if norms else np.empty(0, dtype=np.float64)
+        return self._norms
+
+
+def _row_df(segments: List[Segment], positions: np.ndarray) -> np.ndarray:
+    """Document frequency contributed by the rows at `positions` (indexes into the concatenated segments)"""
+    df = np.zeros(N_FEATURES, dtype=np.float64)
+    if not positions.size:
+        return df
+    starts = np.cumsum([0] + [segment.ids.shape[0] for segment in segments])
+    owners = np.searchsorted(starts, positions, side="right") - 1
+    for owner in np.unique(owners):
+        rows = positions[owners == owner] - starts[owner]
+        df += np.bincount(segments[owner].matrix[rows].indices, minlength=N_FEATURES)
+    return df
+
+
+_EMPTY_MANIFEST = {"segments": [], "deleted": [], "next_segment": 1, "max_id": 0, "synced_at": None}
+
+
+def _empty_snapshot() -> Snapshot:
+    return Snapshot({}, None, [], np.empty(0, dtype=np.int64), np.empty(0, dtype=bool),
+                    np.zeros(N_FEATURES, dtype=np.float64))
+
+
+class JobVectorIndex:
+    def __init__(self, path: str = INDEX_DIR):
+        self.path = path
+        self._snapshot = _empty_snapshot()
+        self._db_version: Optional[Tuple] = None
+        self._lock = threading.RLock()
+        self._compacting = False
+
+    # -- storage --------------------------------------------------------------
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.path, "manifest.json")
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialize writers within this process and across processes sharing the directory"""
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(os.path.join(self.path, ".lock"), "w") as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                self._reload_if_changed()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        # The manifest is replaced, never edited, so a new inode means a new version
+        try:
+            stat = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _reload_if_changed(self) -> Snapshot:
+        snapshot = self._snapshot
+        if not snapshot.manifest or self._stamp() != snapshot.stamp:
+            self._load()
+            snapshot = self._snapshot
+        return snapshot
+
+    def _load(self):
+        with self._lock:
+            try:
+                stamp = self._stamp()
+                with open(self._manifest_path) as f:
+                    manifest = json.load(f)
+            except FileNotFoundError:
+                manifest, stamp = dict(_EMPTY_MANIFEST), None
+            self._snapshot = self._next_snapshot(self._snapshot, manifest, stamp)
+
+    def _next_snapshot(self, current: Snapshot, manifest: dict, stamp: Optional[Tuple[int, int]]) -> Snapshot:
+        """
+        The snapshot for `manifest`. When it only appends segments or deletes ids
+        (every sync), start from `current` and touch only the rows that changed;
+        after a compaction, rebuild from nothing.
+        """
+        old_names = current.manifest.get("segments", [])
+        old_deleted = set(current.manifest.get("deleted", []))
+        deleted = set(manifest["deleted"])
+        if manifest["segments"][:len(old_names)] != old_names or not old_deleted <= deleted:
+            current, old_names, old_deleted = _empty_snapshot(), [], set()
+
+        added = [Segment(os.path.join(self.path, name)) for name in manifest["segments"][len(old_names):]]
+        new_ids = np.concatenate([s.ids for s in added]) if added else np.empty(0, dtype=np.int64)
+        deleted_ids = np.asarray(sorted(deleted), dtype=np.int64)
+        newly_deleted = np.asarray(sorted(deleted - old_deleted), dtype=np.int64)
+
+        # The last copy of an id wins; deleted ids have no live copy
+        new_live = np.zeros(new_ids.shape[0], dtype=bool)
+        if new_ids.size:
+            _, last_from_end = np.unique(new_ids[::-1], return_index=True)
+            new_live[new_ids.size - 1 - last_from_end] = True
+            if deleted_ids.size:
+                new_live &= ~np.isin(new_ids, deleted_ids)
+        superseded = current.live & np.isin(current.ids, np.union1d(new_ids, newly_deleted))
+
+        segments = current.segments + added
+        df = (current.df - _row_df(current.segments, np.flatnonzero(superseded))
+              + _row_df(segments, current.ids.size + np.flatnonzero(new_live)))
+        live = np.concatenate([current.live & ~superseded, new_live])
+        return Snapshot(manifest, stamp, segments, np.concatenate([current.ids, new_ids]), live, df)
+
+    def _commit(self, manifest: dict):
+        tmp = f"{self._manifest_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path)
+        self._load()
+
+    def _add(self, ids: np.ndarray, tf: sparse.csr_matrix, deleted: Sequence[int] = (), synced: Optional[dict] = None):
+        """Write one segment (if there are rows) and publish it; caller holds the write lock"""
+        manifest = dict(self._snapshot.manifest)
+        deleted = set(int(i) for i in deleted) - set(manifest["deleted"])
+        if not ids.size and not deleted:
+            return  # nothing to publish: keep the manifest and the snapshot as they are
+        if ids.size:
+            name = f"seg-{manifest['next_segment']:06d}"
+            Segment.write(os.path.join(self.path, name), ids, tf)
+            manifest["segments"] = manifest["segments"] + [name]
+            manifest["next_segment"] += 1
+        if deleted:
+            manifest["deleted"] = sorted(set(manifest["deleted"]) | deleted)
+        manifest.update(synced or {})
+        self._commit(manifest)
+
+    # -- maintenance ------------------------------------------------------------
+
+    def open(self):
+        with self._lock:
+            self._load()
+        snapshot = self._snapshot
+        logger.info(f"Vector index opened: {int(snapshot.live.sum())} postings in {len(snapshot.segments)} segment(s)")
+
+    def sync(self, db: Session):
+        """
+        Index postings added or changed since the last sync and forget deleted
+        ones. A cheap version check makes this a no-op when nothing changed.
+        """
+        version = tuple(db.exec(
+            select(func.count(JobPosting.id), func.max(JobPosting.id), func.max(JobPosting.updated_at))
+        ).one())
+        if version == self._db_version:
+            return
+
+        with self._write_lock():
+            started = datetime.utcnow()
+            max_id = self._snapshot.manifest["max_id"]
+            synced_at = self._snapshot.manifest["synced_at"]
+
+            query = select(JobPosting.id, JobPosting.title, JobPosting.company, JobPosting.description)
+            if synced_at:
+                changed = (JobPosting.id <= max_id) & (JobPosting.updated_at > datetime.fromisoformat(synced_at))
+                query = query.where((JobPosting.id > max_id) | changed)
+            rows = db.exec(query.order_by(JobPosting.id)).all()
+
+            deleted: List[int] = []
+            live_ids = self._snapshot.ids[self._snapshot.live]
+            if version[0] < live_ids.size + sum(1 for row in rows if row.id > max_id):
+                existing = np.asarray(db.connection().execute(select(JobPosting.id)).scalars().all(), dtype=np.int64)
+                deleted = live_ids[~np.isin(live_ids, existing)].tolist()
+
+            for start in range(0, max(len(rows), 1), SYNC_BATCH):
+                batch = rows[start:start + SYNC_BATCH]
+                ids = np.fromiter((row.id for row in batch), dtype=np.int64, count=len(batch))
+                tf = vectorize(posting_text(row.title, row.company, row.description) for row in batch)
+                last = start + SYNC_BATCH >= len(rows)
+                synced = {
+                    "max_id": max(max_id, int(ids.max()) if ids.size else 0),
+                    "synced_at": started.isoformat() if last else synced_at,
+                }
+                max_id = synced["max_id"]
+                self._add(ids, tf, deleted if last else (), synced)
+
+            self._db_version = version
+            if rows or deleted:
+                logger.info(f"Vector index synced: {len(rows)} indexed, {len(deleted)} removed")
+        self.maybe_compact()
+
+    def compact(self):
+        """Merge all segments into one, dropping superseded and deleted rows"""
+        with self._write_lock():
+            snapshot = self._snapshot
+            if len(snapshot.segments) <= 1 and not snapshot.manifest["deleted"]:
+                return
+            old = list(snapshot.manifest["segments"])
+            parts, ids, offset = [], [], 0
+            for segment in snapshot.segments:
+                rows = np.flatnonzero(snapshot.live[offset:offset + segment.ids.shape[0]])
+                offset += segment.ids.shape[0]
+                parts.append(segment.matrix[rows])
+                ids.append(np.asarray(segment.ids[rows]))
+
+            manifest = dict(snapshot.manifest, segments=[], deleted=[])
+            merged_ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+            if merged_ids.size:
+                order = np.argsort(merged_ids, kind="stable")
+                merged = sparse.vstack(parts, format="csr")[order]
+                name = f"seg-{manifest['next_segment']:06d}"
+                Segment.write(os.path.join(self.path, name), merged_ids[order], merged)
+                manifest["segments"], manifest["next_segment"] = [name], manifest["next_segment"] + 1
+            self._commit(manifest)
+
+            # Readers that still map the old files keep working; unlinked files live until unmapped
+            for name in old:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+            logger.info(f"Vector index compacted {len(old)} segment(s) into {len(manifest['segments'])}")
+
+    def maybe_compact(self):
+        if len(self._snapshot.segments) <= COMPACT_SEGMENTS or self._compacting:
+            return
+        self._compacting = True
+
+        def _run():
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Vector index compaction failed: {e}")
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=_run, name="vector-index-compaction", daemon=True).start()
+
+    # -- queries ----------------------------------------------------------------
+
+    def vector(self, posting_id: int) -> Optional[sparse.csr_matrix]:
+        """The stored TF row of a posting"""
+        snapshot = self._reload_if_changed()
+        positions = np.flatnonzero((snapshot.ids == posting_id) & snapshot.live)
+        if not positions.size:
+            return None
+        offset = 0
+        for segment in snapshot.segments:
+            size = segment.ids.shape[0]
+            if positions[0] < offset + size:
+                return segment.matrix[positions[0] - offset]
+            offset += size
+        return None
+
+    def rank_vector(self, query: sparse.csr_matrix, k: int = 20, allowed_ids: Optional[np.ndarray] = None,
+                    excluded_ids: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Cosine similarity of TF-IDF vectors between `query` and every live posting, top k"""
+        snapshot = self._reload_if_changed()
+        segments, ids, live, idf_squared = snapshot.segments, snapshot.ids, snapshot.live, snapshot.idf_squared
+        if not ids.size or not query.nnz:
+            return []
+
+        # cos(x, q) = sum(x_i q_i idf_i^2) / (|x * idf| |q * idf|); row norms are cached per segment
+        weighted_query = np.zeros(N_FEATURES, dtype=np.float64)
+        weighted_query[query.indices] = query.data * idf_squared[query.indices]
+        query_norm = float(np.sqrt(np.dot(np.square(query.data, dtype=np.float64), idf_squared[query.indices])))
+        dots = np.concatenate([segment.matrix @ weighted_query for segment in segments])
+        norms = snapshot.norms()
+        scores = np.divide(dots, norms * query_norm, out=np.zeros_like(dots), where=norms > 0)
+
+        scores[~live] = -1.0
+        if allowed_ids is not None:
+            scores[~np.isin(ids, allowed_ids)] = -1.0
+        if excluded_ids is not None and excluded_ids.size:
+            scores[np.isin(ids, excluded_ids)] = -1.0
+        best = [i for i in top_k(scores, k) if scores[i] > 0]
+        return [(int(ids[i]), float(scores[i])) for i in best]
+
+    def rank(self, text: str, k: int = 20, **kwargs) -> List[Tuple[int, float]]:
+        return self.rank_vector(vectorize([text]), k, **kwargs)
+
+    def stats(self) -> dict:
+        snapshot = self._reload_if_changed()
+        return {
+            "path": self.path,
+            "segments": len(snapshot.segments),
+            "rows": int(snapshot.ids.size),
+            "live": int(snapshot.live.sum()),
+            "deleted": len(snapshot.manifest.get("deleted", [])),
+            "max_id": snapshot.manifest.get("max_id"),
+            "synced_at": snapshot.manifest.get("synced_at"),
+        }
+
+
+job_index = JobVectorIndex()
@@ -0,0 +1,88 @@
+# backend/services/vectorizer.py
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+from scipy import sparse
+
+from backend.services.keywords import SYNONYMS
+
+# Hashing vectorizer: unigrams and bigrams hashed into N_FEATURES columns with
+# sublinear term frequency. IDF is applied by the index at query time.
+N_FEATURES = 1 << 18
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_BIGRAM_MULTIPLIER = 0x9E3779B1
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our that the this to we will with you your".split()
+)
+
+
+def _hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+# Synonyms and stopwords are applied to token hashes, after hashing in bulk
+_ALIASES = sorted((_hash(alias), _hash(target)) for alias, target in SYNONYMS.items() if " " not in alias)
+_ALIAS_HASHES = np.array([alias for alias, _ in _ALIASES], dtype=np.uint64)
+_TARGET_HASHES = np.array([target for _, target in _ALIASES], dtype=np.uint64)
+_STOP_HASHES = np.array(sorted(_hash(word) for word in _STOPWORDS), dtype=np.uint64)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(_TAG_RE.sub(" ", text or "").lower())
+
+
+def vectorize(texts: Iterable[str]) -> sparse.csr_matrix:
+    """
+    Sublinear TF rows (not yet IDF-weighted or normalized) as a CSR matrix.
+    Tokens from all documents are hashed in one C-level pass; synonym folding,
+    stopword removal and bigram columns are then computed with NumPy, so there
+    is no per-token Python work.
+    """
+    tokens: List[str] = []
+    lengths: List[int] = []
+    for text in texts:
+        words = tokenize(text)
+        tokens.extend(words)
+        lengths.append(len(words))
+
+    n_docs = len(lengths)
+    hashes = np.fromiter(map(zlib.crc32, map(str.encode, tokens)), dtype=np.uint64, count=len(tokens))
+    rows = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+
+    position = np.minimum(np.searchsorted(_ALIAS_HASHES, hashes), _ALIAS_HASHES.size - 1)
+    is_alias = _ALIAS_HASHES[position] == hashes
+    hashes[is_alias] = _TARGET_HASHES[position[is_alias]]
+    keep = ~np.isin(hashes, _STOP_HASHES)
+    hashes, rows = hashes[keep], rows[keep]
+
+    # Bigrams: pairs of neighbouring tokens inside the same document
+    same_doc = rows[1:] == rows[:-1]
+    bigrams = (hashes[:-1][same_doc] * np.uint64(_BIGRAM_MULTIPLIER) + hashes[1:][same_doc]) & np.uint64(0xFFFFFFFF)
+    columns = np.concatenate([hashes, bigrams]) & np.uint64(N_FEATURES - 1)
+    rows = np.concatenate([rows, rows[1:][same_doc]])
+
+    # Duplicate (row, column) pairs are summed into term counts
+    counts = sparse.csr_matrix(
+        (np.ones(columns.shape[0], dtype=np.float32), (rows, columns.astype(np.int64))),
+        shape=(n_docs, N_FEATURES),
+    )
+    counts.sum_duplicates()
+    counts.data = 1.0 + np.log(counts.data)
+    return counts
+
+
+def posting_text(title: str, company: str, description: str) -> str:
+    # Title terms count twice
+    return f"{title} {title} {company} {description}"
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, without sorting everything"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
@@ -0,0 +1,129 @@
+# backend/worker.py
+"""
+Background task worker.
+
+    python -m backend.worker --concurrency 4 [--scheduler]
+
+Claims tasks from the database queue, runs them with heartbeats so long jobs
+keep their claim, and retries failures with exponential backoff. With
+--scheduler it also polls scheduled RSS feeds (backend/services/scheduler.py).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Optional
+
+from sqlmodel import Session
+
+from backend.database import create_db_and_tables, engine
+from backend.models import Task
+from backend.services import stats  # noqa: F401  registers application stat hooks
+from backend.services.scheduler import run_scheduler
+from backend.services.task_handlers import TaskContext
+from backend.services.tasks import (
+    VISIBILITY_TIMEOUT, TaskDeferred, claim_next, complete, defer, extend_claim, fail, get_handler,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+TASK_TIMEOUT = float(os.getenv("TASK_TIMEOUT", "600"))
+
+
+def _claim(worker_id: str, kinds: Optional[list]) -> Optional[Task]:
+    with Session(engine) as db:
+        task = claim_next(db, worker_id, kinds=kinds)
+        if task is not None:
+            db.expunge(task)
+        return task
+
+
+def _with_session(func, *args):
+    with Session(engine) as db:
+        return func(db, *args)
+
+
+async def _heartbeat(task_id: int, worker_id: str):
+    while True:
+        await asyncio.sleep(VISIBILITY_TIMEOUT / 3)
+        await asyncio.to_thread(_with_session, extend_claim, task_id, worker_id)
+
+
+async def run_task(task: Task, worker_id: str):
+    handler = get_handler(task.kind)
+    if handler is None:
+        await asyncio.to_thread(_with_session, fail, task.id, worker_id, f"No handler for task kind '{task.kind}'")
+        return
+
+    heartbeat = asyncio.create_task(_heartbeat(task.id, worker_id))
+    try:
+        payload = json.loads(task.payload or "{}")
+        result = await asyncio.wait_for(handler(TaskContext(task.id, worker_id), **payload), timeout=TASK_TIMEOUT)
+        await asyncio.to_thread(_with_session, complete, task.id, worker_id, result)
+        logger.info(f"Task {task.id} ({task.kind}) succeeded")
+    except TaskDeferred as e:
+        await asyncio.to_thread(_with_session, defer, task.id, worker_id, e.delay, e.reason)
+        logger.info(f"Task {task.id} ({task.kind}) deferred for {e.delay:.0f}s: {e.reason}")
+    except asyncio.CancelledError:
+        # Shutting down: the claim expires and another worker picks the task up
+        raise
+    except Exception as e:
+        error = "Timed out" if isinstance(e, asyncio.TimeoutError) else f"{type(e).__name__}: {e}"
+        await asyncio.to_thread(_with_session, fail, task.id, worker_id, error)
+    finally:
+        heartbeat.cancel()
+
+
+async def _worker_loop(worker_id: str, poll_interval: float, kinds: Optional[list]):
+    while True:
+        try:
+            task = await asyncio.to_thread(_claim, worker_id, kinds)
+        except Exception as e:
+            logger.error(f"Worker {worker_id} could not claim a task: {e}")
+            task = None
+        if task is None:
+            await asyncio.sleep(poll_interval)
+            continue
+        await run_task(task, worker_id)
+
+
+async def run_worker(concurrency: int = WORKER_CONCURRENCY, poll_interval: float = POLL_INTERVAL,
+                     kinds: Optional[list] = None, scheduler: bool = False):
+    """Run `concurrency` task slots (and optionally the feed scheduler) until cancelled"""
+    base_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Worker {base_id} started with {concurrency} slot(s)")
+    loops = [
+        asyncio.create_task(_worker_loop(f"{base_id}:{slot}", poll_interval, kinds))
+        for slot in range(concurrency)
+    ]
+    if scheduler:
+        loops.append(asyncio.create_task(run_scheduler()))
+    try:
+        await asyncio.gather(*loops)
+    finally:
+        for loop in loops:
+            loop.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JobHunter background task worker")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--kinds", nargs="*", help="Only run these task kinds")
+    parser.add_argument("--scheduler", action="store_true", help="Also poll scheduled RSS feeds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    create_db_and_tables()
+    try:
+        asyncio.run(run_worker(args.concurrency, args.poll_interval, args.kinds, args.scheduler))
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/feed_parser.py
+"""
+Compare the streaming feed parser with feedparser on large generated feeds.
+
+    python -m benchmarks.feed_parser --entries 5000 --limit 10
+
+Reports wall time and peak traced memory for a full parse and for the
+limited parse the scraper actually does.
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+
+import feedparser
+
+from backend.services.feed_stream import iter_feed_jobs
+from backend.services.scraper import _entry_to_job
+
+_DESCRIPTION = (
+    "<p>We are hiring a <b>{title}</b> to build data pipelines with Python, FastAPI and "
+    "PostgreSQL. You will work with Kubernetes, Terraform and a small, friendly team.</p>"
+    "<ul><li>5+ years of experience</li><li>Remote friendly</li><li>Competitive salary</li></ul>"
+)
+
+
+def make_rss(entries: int) -> bytes:
+    now = datetime(2024, 1, 1)
+    items = "".join(
+        f"<item><title>Engineer {i}</title><link>https://jobs.example.com/{i}</link>"
+        f"<guid isPermaLink=\"false\">job-{i}</guid><dc:creator>Company {i % 50}</dc:creator>"
+        f"<pubDate>{format_datetime(now - timedelta(minutes=i))}</pubDate>"
+        f"<description><![CDATA[{_DESCRIPTION.format(title=f'Engineer {i}')}]]></description></item>"
+        for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><rss version="2.0" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/"><channel><title>Jobs</title>'
+        f"{items}</channel></rss>"
+    ).encode("utf-8")
+
+
+def make_atom(entries: int) -> bytes:
+    items = "".join(
+        f"<entry><title>Engineer {i}</title><link rel=\"alternate\" href=\"https://jobs.example.com/{i}\"/>"
+        f"<id>urn:job:{i}</id><author><name>Company {i % 50}</name></author>"
+        f"<updated>2024-01-01T00:00:00Z</updated>"
+        f"<summary type=\"html\">{_DESCRIPTION.format(title=f'Engineer {i}').replace('<', '&lt;')}</summary></entry>"
+        for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+        f"<title>Jobs</title>{items}</feed>"
+    ).encode("utf-8")
+
+
+def _chunks(data: bytes, size: int = 65536):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def with_feedparser(data: bytes, limit):
+    entries = feedparser.parse(data).entries
+    return [_entry_to_job(entry, "bench") for entry in entries[:limit]]
+
+
+def with_stream(data: bytes, limit):
+    return list(iter_feed_jobs(_chunks(data), "bench", limit=limit, max_bytes=len(data)))
+
+
+def measure(func, data: bytes, limit, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        jobs = func(data, limit)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(data, limit)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming feed parsing against feedparser")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, data in (("rss", make_rss(args.entries)), ("atom", make_atom(args.entries))):
+        print(f"{name}: {args.entries} entries, {len(data) / 1024 / 1024:.1f} MiB")
+        for limit in (None, args.limit):
+            for label, func in (("feedparser", with_feedparser), ("stream", with_stream)):
+                elapsed, peak, count = measure(func, data, limit, args.repeat)
+                print(f"  {label:<10} limit={str(limit):<5} {elapsed * 1000:9.1f} ms  "
+                      f"peak {peak / 1024 / 1024:7.2f} MiB  {count} jobs")
+
+
+if __name__ == "__main__":
+    main()